@@ -0,0 +1,89 @@
+import asyncio
+
+from pack import Packer
+from unpack import Unpacker
+
+
+class AsyncPackWriter:
+    # Packs objects onto an asyncio.StreamWriter, coalescing them into one
+    # write() once max_bytes are pending or max_delay seconds after the first
+    # pending object, whichever comes first. Size-triggered flushes await
+    # drain(), so a slow peer applies backpressure to write().
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        max_bytes=65536,
+        max_delay=0.001,
+        using_single_float=False,
+    ):
+        self._writer = writer
+        self._packer = Packer(using_single_float=using_single_float)
+        self._pending = bytearray()
+        self._timer = None
+        self._needs_drain = False
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+
+    async def write(self, obj):
+        if self._needs_drain:
+            self._needs_drain = False
+            await self._writer.drain()
+        pending = self._pending
+        start = len(pending)
+        try:
+            self._packer.pack_into(obj, pending, offset=start)
+        except BaseException:
+            # Drop the partly packed object so it never reaches the peer.
+            del pending[start:]
+            raise
+        if len(pending) >= self.max_bytes:
+            await self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.max_delay, self._flush_pending)
+
+    async def flush(self):
+        self._flush_pending()
+        self._needs_drain = False
+        await self._writer.drain()
+
+    async def close(self):
+        await self.flush()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            # The transport may keep a reference to the data it is given, so
+            # hand it the whole buffer and start a new one.
+            data, self._pending = self._pending, bytearray()
+            self._writer.write(data)
+            self._needs_drain = True
+
+
+class AsyncUnpacker:
+    # Yields the objects packed on an asyncio.StreamReader as they arrive.
+    def __init__(self, reader: asyncio.StreamReader, read_size=65536):
+        self._reader = reader
+        self._unpacker = Unpacker()
+        self.read_size = read_size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        unpacker = self._unpacker
+        while True:
+            try:
+                return next(unpacker)
+            except StopIteration:
+                pass
+            data = await self._reader.read(self.read_size)
+            if not data:
+                if unpacker.pending:
+                    raise ValueError("Stream ended inside a packed object")
+                raise StopAsyncIteration
+            unpacker.feed(data)
@@ -0,0 +1,211 @@
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import msgpack
+from demo import data as demo_data
+from pack import Packer, PackerPool, pack
+
+
+class ChainPacker(Packer):
+    # The isinstance chain Packer._pack used before the dispatch table.
+    def _pack(self, obj):
+        if obj is None:
+            self._pack_none(obj)
+        elif isinstance(obj, bool):
+            self._pack_bool(obj)
+        elif isinstance(obj, int):
+            self._pack_int(obj)
+        elif isinstance(obj, float):
+            self._pack_float(obj)
+        elif isinstance(obj, str):
+            self._pack_str(obj)
+        elif isinstance(obj, (bytes, bytearray)):
+            self._pack_bytes(obj)
+        elif isinstance(obj, (list, tuple)):
+            self._pack_array(obj)
+        elif isinstance(obj, dict):
+            self._pack_map(obj)
+        else:
+            raise TypeError("Cannot pack object of type %s" % type(obj))
+
+
+def _deep(depth):
+    obj = [1, "leaf"]
+    for i in range(depth):
+        obj = [i, {"child": obj}]
+    return obj
+
+
+PAYLOADS = {
+    "small_ints": list(range(-32, 128)) * 10,
+    "long_strings": ["t" * 10000] * 20,
+    "large_binary": b"x" * (4 * 1024 * 1024),
+    "wide_map": {"key_%d" % i: i for i in range(10000)},
+    "deep_nesting": _deep(100),
+    "demo": demo_data,
+}
+
+IMPLEMENTATIONS = {
+    "pack": pack,
+    "iterative": Packer(iterative=True).pack,
+    "msgpack": lambda obj: msgpack.packb(obj, use_bin_type=True),
+}
+
+
+def measure(func, obj, repeat=3):
+    timer = timeit.Timer(lambda: func(obj))
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+    size = len(func(obj))
+    tracemalloc.start()
+    func(obj)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ops_per_sec": 1 / seconds,
+        "bytes_per_sec": size / seconds,
+        "peak_bytes": peak,
+    }
+
+
+def run_suite(payloads):
+    results = {}
+    for name in payloads:
+        obj = PAYLOADS[name]
+        assert pack(obj) == IMPLEMENTATIONS["msgpack"](obj), name
+        results[name] = {
+            impl: measure(func, obj) for impl, func in IMPLEMENTATIONS.items()
+        }
+        print(
+            "%-13s %12s %14s %12s %9s"
+            % (name, "ops/sec", "MB/sec", "peak KiB", "vs ref")
+        )
+        reference = results[name]["msgpack"]["ops_per_sec"]
+        for impl, stats in results[name].items():
+            print(
+                "  %-11s %12.1f %14.2f %12.1f %8.2fx"
+                % (
+                    impl,
+                    stats["ops_per_sec"],
+                    stats["bytes_per_sec"] / 1e6,
+                    stats["peak_bytes"] / 1024,
+                    stats["ops_per_sec"] / reference,
+                )
+            )
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Returns the payloads whose pack() throughput dropped by more than
+    # threshold (a fraction) relative to the saved baseline.
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["pack"]["ops_per_sec"]
+        after = stats["pack"]["ops_per_sec"]
+        change = after / before - 1
+        print("%-13s %+7.1f%% vs baseline" % (name, change * 100))
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def bench_dispatch(number=200):
+    for name in ("demo", "wide_map"):
+        payload = PAYLOADS[name]
+        chain = ChainPacker()
+        table = Packer()
+        assert chain.pack(payload) == table.pack(payload)
+        chain_time = min(timeit.repeat(lambda: chain.pack(payload), number=number))
+        table_time = min(timeit.repeat(lambda: table.pack(payload), number=number))
+        print(
+            "%-10s chain %8.2f us  table %8.2f us  speedup %.2fx"
+            % (
+                name,
+                chain_time / number * 1e6,
+                table_time / number * 1e6,
+                chain_time / table_time,
+            )
+        )
+
+
+def bench_threads(threads=8, number=20000):
+    # Small messages packed from several threads at once: a new Packer per
+    # call against per-thread packers reused through a PackerPool.
+    payload = {"id": 12345, "name": "event", "tags": ["a", "b"], "score": 0.5}
+    pool = PackerPool()
+    contenders = {
+        "per_call": lambda obj: Packer().pack(obj),
+        "pool": pool.pack,
+    }
+    per_thread = number // threads
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for name, func in contenders.items():
+            assert func(payload) == msgpack.packb(payload)
+
+            def work():
+                for _ in range(per_thread):
+                    func(payload)
+
+            def run():
+                for future in [executor.submit(work) for _ in range(threads)]:
+                    future.result()
+
+            elapsed = min(timeit.repeat(run, number=1, repeat=3))
+            print(
+                "%-9s %2d threads %10.0f ops/sec"
+                % (name, threads, per_thread * threads / elapsed)
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pack.py")
+    parser.add_argument(
+        "payloads", nargs="*", metavar="PAYLOAD", help=", ".join(PAYLOADS)
+    )
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--dispatch",
+        action="store_true",
+        help="compare the dispatch table with the old isinstance chain",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        metavar="N",
+        help="compare per-call Packer construction with a PackerPool on N threads",
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.payloads) - set(PAYLOADS)
+    if unknown:
+        parser.error("unknown payloads: %s" % ", ".join(sorted(unknown)))
+
+    if args.dispatch:
+        bench_dispatch()
+        return 0
+    if args.threads:
+        bench_threads(args.threads)
+        return 0
+
+    results = run_suite(args.payloads or list(PAYLOADS))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fp:
+            json.dump(results, fp, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(results, json.load(fp), args.threshold)
+        if regressions:
+            print("Regressions: %s" % ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
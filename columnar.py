@@ -0,0 +1,76 @@
+from collections.abc import Mapping, Sequence
+from operator import itemgetter
+
+from lazy import lazy_unpack
+from pack import Packer
+from unpack import unpack
+
+
+def pack_columns(records, packer: Packer = None) -> bytes:
+    # Packs a list of dicts that all have the same keys as a map from each
+    # key to the list of its values, in record order. Keys are written once
+    # rather than once per record, and columns of floats or ints take the
+    # packer's bulk path. The output is a plain msgpack map.
+    if packer is None:
+        packer = Packer()
+    return packer.pack(_transpose(records))
+
+
+def _transpose(records) -> dict:
+    if not records:
+        return {}
+    keys = list(records[0])
+    if not keys:
+        raise ValueError("Records without keys cannot be packed as columns")
+    if set(map(len, records)) != {len(keys)}:
+        raise ValueError("Records do not all have the same keys")
+    get = itemgetter(*keys)
+    try:
+        if len(keys) == 1:
+            return {keys[0]: list(map(get, records))}
+        return dict(zip(keys, map(list, zip(*map(get, records)))))
+    except KeyError:
+        raise ValueError("Records do not all have the same keys") from None
+
+
+def unpack_columns(data, lazy=False, zero_copy=False, ext_hook=None):
+    # Returns the records of a pack_columns() map as a ColumnRows sequence.
+    # With lazy=True the columns are lazy_unpack() views, so only the cells
+    # of the records that are accessed get decoded.
+    if lazy:
+        columns = lazy_unpack(data, zero_copy=zero_copy, ext_hook=ext_hook)
+    else:
+        columns = unpack(data, zero_copy=zero_copy, ext_hook=ext_hook)
+    if not isinstance(columns, Mapping):
+        raise ValueError("Packed object is not a map of columns")
+    return ColumnRows(columns)
+
+
+class ColumnRows(Sequence):
+    # Read-only sequence of records over a map of equally long columns.
+    # Each record is built as a new dict when it is accessed.
+    def __init__(self, columns: Mapping):
+        self.columns = columns
+        self._keys = list(columns)
+        self._values = [columns[key] for key in self._keys]
+        lengths = set(map(len, self._values))
+        if len(lengths) > 1:
+            raise ValueError("Columns do not all have the same length")
+        self._n = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(self._n)[i]]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("ColumnRows index out of range")
+        return dict(zip(self._keys, [column[i] for column in self._values]))
+
+    def __iter__(self):
+        keys = self._keys
+        for values in zip(*self._values):
+            yield dict(zip(keys, values))
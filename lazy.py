@@ -0,0 +1,116 @@
+from array import array
+from collections.abc import Mapping, Sequence
+
+from unpack import _read_container_header, _skip, _unpack_from
+
+
+def lazy_unpack(data, index=True, zero_copy=False, ext_hook=None, validate=False):
+    # Returns a read-only view over a packed map or array that decodes only
+    # the values that are accessed; sibling values are stepped over by reading
+    # their headers. Nested maps and arrays are returned as views too, and any
+    # other top-level value is decoded directly. With index=True, each view
+    # records the offsets of all its items on first access so that later
+    # lookups do not scan; with index=False, each lookup scans only up to the
+    # item it finds. data is read in place and must stay unchanged while views
+    # over it are in use. zero_copy and ext_hook are passed on to unpack()
+    # for the values that get decoded. validate=True checks up front that
+    # data holds exactly one packed object, which walks all of its headers.
+    view = memoryview(data).cast("B")
+    if validate and _skip(view, 0) != len(view):
+        raise ValueError("Extra data after packed object")
+    return _lazy_value(view, 0, index, (zero_copy, ext_hook))
+
+
+def _lazy_value(buf, pos, index, decode):
+    header = _read_container_header(buf, pos)
+    if header is None:
+        return _unpack_from(buf, pos, *decode)[0]
+    is_map, n, start = header
+    view_type = LazyMap if is_map else LazyArray
+    return view_type(buf, n, start, index, decode)
+
+
+def _unpack_key(buf, pos):
+    key, end = _unpack_from(buf, pos)
+    return (tuple(key) if type(key) is list else key), end
+
+
+class LazyArray(Sequence):
+    def __init__(self, buf, n, start, index, decode):
+        self._buf = buf
+        self._n = n
+        self._start = start
+        self._index = index
+        self._decode = decode
+        self._offsets = None
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(self._n)[i]]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("LazyArray index out of range")
+        return _lazy_value(self._buf, self._offset(i), self._index, self._decode)
+
+    def _offset(self, i):
+        if self._offsets is not None:
+            return self._offsets[i]
+        buf = self._buf
+        pos = self._start
+        if not self._index:
+            for _ in range(i):
+                pos = _skip(buf, pos)
+            return pos
+        offsets = array("Q")
+        for _ in range(self._n):
+            offsets.append(pos)
+            pos = _skip(buf, pos)
+        self._offsets = offsets
+        return offsets[i]
+
+
+class LazyMap(Mapping):
+    def __init__(self, buf, n, start, index, decode):
+        self._buf = buf
+        self._n = n
+        self._start = start
+        self._index = index
+        self._decode = decode
+        self._offsets = None
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        if self._offsets is not None:
+            return iter(self._offsets)
+        return (key for key, _ in self._scan())
+
+    def __getitem__(self, key):
+        if self._offsets is None:
+            if self._index:
+                self._offsets = dict(self._scan())
+            else:
+                # Stop at the first match, so with duplicate keys this finds
+                # the first one rather than the last one unpack() keeps.
+                for candidate, pos in self._scan():
+                    if candidate == key:
+                        return self._value(pos)
+                raise KeyError(key)
+        return self._value(self._offsets[key])
+
+    def _value(self, pos):
+        return _lazy_value(self._buf, pos, self._index, self._decode)
+
+    def _scan(self):
+        # Yields (key, value offset) pairs, skipping over the values.
+        buf = self._buf
+        pos = self._start
+        for _ in range(self._n):
+            key, pos = _unpack_key(buf, pos)
+            yield key, pos
+            pos = _skip(buf, pos)
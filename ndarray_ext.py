@@ -0,0 +1,43 @@
+from pack import ExtType, pack
+from unpack import _unpack_from
+
+# Ext payload: a packed [dtype.str, shape] header followed by the raw bytes of
+# the array in C order. NumPy is imported only when these functions are used.
+NDARRAY_EXT_CODE = 1
+
+
+def register_ndarray(packer, code=NDARRAY_EXT_CODE):
+    # Packs numpy.ndarray values on packer as ext values instead of msgpack
+    # arrays, writing the array memory directly.
+    import numpy
+
+    packer.register(numpy.ndarray, lambda p, obj: _pack_ndarray(p, obj, code))
+
+
+def _pack_ndarray(packer, obj, code):
+    import numpy
+
+    if numpy.dtype(obj.dtype.str) != obj.dtype or obj.dtype.hasobject:
+        raise TypeError("Cannot pack ndarray of dtype %s" % obj.dtype)
+    header = pack([obj.dtype.str, list(obj.shape)])
+    # Copies only if obj is not already C-contiguous.
+    data = memoryview(numpy.ascontiguousarray(obj).reshape(-1).view(numpy.uint8))
+    packer._buffer.write(packer.pack_ext_header(code, len(header) + data.nbytes))
+    packer._buffer.write(header)
+    packer._buffer.write(data)
+
+
+def ndarray_ext_hook(code, data, ndarray_code=NDARRAY_EXT_CODE):
+    # ext_hook for unpack()/Unpacker. The array is built with
+    # numpy.frombuffer over data, so with unpack(..., zero_copy=True) it
+    # shares memory with the packed input and is read-only.
+    if code != ndarray_code:
+        return ExtType(code, data)
+    import numpy
+
+    (dtype, shape), offset = _unpack_from(memoryview(data).cast("B"), 0)
+    count = 1
+    for size in shape:
+        count *= size
+    array = numpy.frombuffer(data, dtype=dtype, count=count, offset=offset)
+    return array.reshape(shape)
@@ -1,41 +1,811 @@
 import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
 from io import BytesIO
+from itertools import chain
+from operator import eq
+from time import perf_counter
+from typing import NamedTuple
 
 
 def pack(obj, using_single_float=False):
+    return _default_pools[bool(using_single_float)].pack(obj)
+
+
+def pack_many(objs, using_single_float=False):
+    return _default_pools[bool(using_single_float)].pack_many(objs)
+
+
+def pack_stream(iterable, fp, count=None, using_single_float=False, chunk_size=65536):
     packer = Packer(using_single_float=using_single_float)
-    return packer.pack(obj)
+    return packer.pack_stream(iterable, fp, count=count, chunk_size=chunk_size)
+
+
+def packed_size(obj, using_single_float=False):
+    packer = Packer(using_single_float=using_single_float)
+    return packer.packed_size(obj)
+
+
+def pack_spooled(obj, max_memory=64 * 1024 * 1024, dir=None, using_single_float=False):
+    packer = Packer(using_single_float=using_single_float)
+    return packer.pack_spooled(obj, max_memory=max_memory, dir=dir)
+
+
+# Marker byte and struct code for each int format, in the order
+# Packer._pack_int picks them. Used to encode a whole sequence of ints at
+# once when they all share one format.
+_int_formats = (
+    (0x80, 0xFF, b"\xcc", "B"),
+    (0x100, 0xFFFF, b"\xcd", "H"),
+    (0x10000, 0xFFFFFFFF, b"\xce", "I"),
+    (0x100000000, 0xFFFFFFFFFFFFFFFF, b"\xcf", "Q"),
+    (-0x80, -0x21, b"\xd0", "b"),
+    (-0x8000, -0x81, b"\xd1", "h"),
+    (-0x80000000, -0x8001, b"\xd2", "i"),
+    (-0x8000000000000000, -0x80000001, b"\xd3", "q"),
+)
+
+
+# fixext 1/2/4/8/16 markers, keyed by data size.
+_fix_ext_markers = {1: b"\xd4", 2: b"\xd5", 4: b"\xd6", 8: b"\xd7", 16: b"\xd8"}
+
+
+def _int_format(low: int, high: int):
+    # Returns (marker, struct code) if every int in [low, high] is encoded
+    # with the same format, otherwise None. Positive and negative fixints
+    # are both a single raw byte, so they share a format with no marker.
+    if -0x20 <= low and high <= 0x7F:
+        return b"", "b"
+    for format_low, format_high, marker, code in _int_formats:
+        if format_low <= low and high <= format_high:
+            return marker, code
+    return None
+
+
+def _interleave(marker: bytes, body: bytes, width: int):
+    # Puts the one-byte marker in front of every width-byte item of body.
+    if not marker:
+        return body
+    n = len(body) // width
+    stride = width + 1
+    out = bytearray(stride * n)
+    out[0::stride] = marker * n
+    for k in range(width):
+        out[k + 1 :: stride] = body[k::width]
+    return out
+
+
+_float32 = struct.Struct(">f")
+
+
+def _is_float32(obj: float) -> bool:
+    # Whether obj survives a round trip through float32 unchanged. NaNs never
+    # compare equal, so they always stay float64 and keep their payload bits.
+    try:
+        return _float32.unpack(_float32.pack(obj))[0] == obj
+    except OverflowError:
+        return False
+
+
+def _int_size(obj: int) -> int:
+    # Encoded size of obj, following the format choice of Packer._pack_int.
+    if obj >= 0:
+        if obj <= 0x7F:
+            return 1
+        elif obj <= 0xFF:
+            return 2
+        elif obj <= 0xFFFF:
+            return 3
+        elif obj <= 0xFFFFFFFF:
+            return 5
+        elif obj <= 0xFFFFFFFFFFFFFFFF:
+            return 9
+    elif obj >= -0x20:
+        return 1
+    elif obj >= -0x80:
+        return 2
+    elif obj >= -0x8000:
+        return 3
+    elif obj >= -0x80000000:
+        return 5
+    elif obj >= -0x8000000000000000:
+        return 9
+    raise ValueError("Integer is out of range")
+
+
+def _str_header_size(byte_len: int) -> int:
+    if byte_len <= 0x1F:
+        return 1
+    elif byte_len <= 0xFF:
+        return 2
+    elif byte_len <= 0xFFFF:
+        return 3
+    elif byte_len <= 0xFFFFFFFF:
+        return 5
+    raise ValueError("String is too long to pack")
+
+
+def _bin_header_size(byte_len: int) -> int:
+    if byte_len <= 0xFF:
+        return 2
+    elif byte_len <= 0xFFFF:
+        return 3
+    elif byte_len <= 0xFFFFFFFF:
+        return 5
+    raise ValueError("Bytes is too long to pack")
+
+
+def _container_header_size(n: int, kind: str) -> int:
+    # kind is "List" or "Map", for the error message.
+    if n <= 0xF:
+        return 1
+    elif n <= 0xFFFF:
+        return 3
+    elif n <= 0xFFFFFFFF:
+        return 5
+    raise ValueError("%s is too long to pack" % kind)
+
+
+class ExtType(NamedTuple):
+    # An application-defined msgpack extension value. Codes 0 to 127 are free
+    # for applications; negative codes are reserved by the spec.
+    code: int
+    data: bytes
+
+
+class Raw(NamedTuple):
+    # A value that is already msgpack-encoded, such as a cached sub-document,
+    # written out verbatim wherever it appears. Raw.checked(data) verifies
+    # that data holds exactly one complete value.
+    data: bytes
+
+    @classmethod
+    def checked(cls, data) -> "Raw":
+        # unpack imports this module, so import it only when needed.
+        from unpack import _skip
+
+        with memoryview(data).cast("B") as view:
+            if _skip(view, 0) != len(view):
+                raise ValueError("Extra data after packed object")
+        return cls(data)
+
+
+class StrCache:
+    # Least-recently-used cache from str to its complete msgpack encoding.
+    # Strings longer than max_length characters are never cached. One cache
+    # can be shared by several packers.
+    def __init__(self, maxsize=1024, max_length=64):
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        try:
+            encoded = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return encoded
+
+    def put(self, key: str, encoded: bytes):
+        self._entries[key] = encoded
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class PackStats:
+    # Per-path counters filled in by a Packer created with stats=PackStats().
+    # Paths are the Packer._pack_* methods without the prefix ("fix_str",
+    # "uint16", "map", ...), plus "registered" for registered encoders and
+    # pack_with(). Bytes are those written by the path itself, not by nested
+    # values, so they add up to the total output. Seconds include nested
+    # values and are only recorded with timing=True. saved_bytes is what
+    # auto_single_float saved over packing every float as float64.
+    # hook(stats) is called after each value passed to a pack method (each
+    # item for pack_many() and pack_stream()) has been packed.
+    def __init__(self, timing=False, hook=None):
+        self.timing = timing
+        self.hook = hook
+        self.counts = {}
+        self.bytes = {}
+        self.seconds = {}
+        self.saved_bytes = 0
+
+    def snapshot(self) -> dict:
+        return {
+            path: {
+                "count": count,
+                "bytes": self.bytes.get(path, 0),
+                "seconds": self.seconds.get(path, 0.0),
+            }
+            for path, count in self.counts.items()
+        }
+
+    def reset(self):
+        self.counts.clear()
+        self.bytes.clear()
+        self.seconds.clear()
+        self.saved_bytes = 0
+
+
+class _BufferWriter:
+    __slots__ = ("buffer", "pos")
+
+    def __init__(self, buffer: bytearray, pos=0):
+        self.buffer = buffer
+        self.pos = pos
+
+    def write(self, data):
+        end = self.pos + len(data)
+        self.buffer[self.pos : end] = data
+        self.pos = end
+
+    def tell(self) -> int:
+        return self.pos
+
+
+class _SegmentWriter:
+    # Collects output as a list of segments for socket.sendmsg/os.writev.
+    # Writes shorter than threshold bytes are coalesced into bytearrays;
+    # longer ones are kept by reference, without copying.
+    __slots__ = ("segments", "pending", "threshold", "pos")
+
+    def __init__(self, threshold: int):
+        self.segments = []
+        self.pending = bytearray()
+        self.threshold = threshold
+        self.pos = 0
+
+    def write(self, data):
+        size = len(data)
+        self.pos += size
+        if size < self.threshold:
+            self.pending += data
+            return
+        if self.pending:
+            self.segments.append(self.pending)
+            self.pending = bytearray()
+        self.segments.append(data)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def getvalue(self) -> list:
+        if self.pending:
+            self.segments.append(self.pending)
+            self.pending = bytearray()
+        return self.segments
+
+
+class _SpillWriter:
+    # Writes to memory until the output would exceed max_memory bytes, then
+    # moves it to a temporary file in dir and writes there from then on.
+    __slots__ = ("file", "max_memory", "dir", "pos")
+
+    def __init__(self, max_memory: int, dir=None):
+        self.file = BytesIO()
+        self.max_memory = max_memory
+        self.dir = dir
+        self.pos = 0
+
+    def write(self, data):
+        self.pos += len(data)
+        if self.pos > self.max_memory:
+            self._spill()
+        self.file.write(data)
+
+    def _spill(self):
+        spilled = tempfile.TemporaryFile(dir=self.dir)
+        with self.file.getbuffer() as view:
+            spilled.write(view)
+        self.file = spilled
+        self.max_memory = float("inf")
+
+    def tell(self) -> int:
+        return self.pos
 
 
 class Packer:
-    def __init__(self, using_single_float=False):
+    # Checked in order when a type has no exact entry in the dispatch table,
+    # so subclasses still reach the right encoder (bool before int).
+    _fallback_types = (
+        (bool, "_pack_bool"),
+        (int, "_pack_int"),
+        (float, "_pack_float"),
+        (str, "_pack_str"),
+        ((bytes, bytearray), "_pack_bytes"),
+        ((list, tuple), "_pack_array"),
+        (dict, "_pack_map"),
+        (array, "_pack_typed_array"),
+    )
+
+    def __init__(
+        self,
+        using_single_float=False,
+        str_cache: StrCache = None,
+        stats: PackStats = None,
+        iterative=False,
+        max_depth=None,
+        auto_single_float=False,
+    ):
         self._buffer = BytesIO()
         self._using_single_float = using_single_float
+        # Floats that are exactly representable as float32 are packed as such
+        # and the rest as float64, so nothing is lost. using_single_float,
+        # which packs every float as float32, takes precedence.
+        self._auto_single_float = auto_single_float and not using_single_float
+        self.str_cache = str_cache
+        self.stats = stats
+        if stats is not None:
+            # Shadow every format path with a counting wrapper before the
+            # dispatch table binds them; without stats nothing is wrapped.
+            self._nested_bytes = []
+            for name in dir(type(self)):
+                if name.startswith("_pack_"):
+                    setattr(self, name, self._instrument(name, getattr(self, name)))
+        # Reused by pack_into() so steady-state packing allocates no buffers.
+        self._own_out = bytearray()
+        self._writer = _BufferWriter(self._own_out)
+        self._out = self._own_out
+        self._out_start = 0
+        self._registered = []
+        self._dispatch = {
+            type(None): self._pack_none,
+            bool: self._pack_bool,
+            int: self._pack_int,
+            float: self._pack_float,
+            str: self._pack_str,
+            bytes: self._pack_bytes,
+            bytearray: self._pack_bytes,
+            memoryview: self._pack_bytes,
+            list: self._pack_array,
+            tuple: self._pack_array,
+            dict: self._pack_map,
+            array: self._pack_typed_array,
+            ExtType: self._pack_ext_type,
+            Raw: self._pack_raw,
+        }
+        # Cleared when int or float get a registered encoder, which the bulk
+        # encoding of homogeneous lists would otherwise bypass.
+        self._bulk_numbers = True
+        if str_cache is not None:
+            self._dispatch[str] = self._pack_str_cached
+        self._builtin_types = frozenset(self._dispatch)
+        # Containers the iterative encoder may open itself. Instrumented
+        # packers keep them on the (counted) recursive path.
+        self._inline_containers = {list, tuple, dict} if stats is None else set()
+        if max_depth is not None and not iterative:
+            raise ValueError("max_depth requires iterative=True")
+        self._max_depth = max_depth
+        # Containers open around the value being walked, carried across the
+        # nested _walk calls made by encoders.
+        self._depth = 0
+        if iterative:
+            self._pack = self._walk
+        # Encodes map keys; subclasses may replace it to treat keys specially.
+        self._encode_key = self._pack
+
+    def register(self, typ, encoder):
+        # encoder(packer, obj) writes the encoded value, usually by calling
+        # packer._pack() on a substitute object.
+        self._registered.insert(0, (typ, encoder))
+        if typ in (int, float):
+            self._bulk_numbers = False
+        self._inline_containers.discard(typ)
+        self._clear_lookups()
+
+    def _clear_lookups(self):
+        # Forgets the types added by _lookup, so they are looked up again.
+        self._inline_containers &= {list, tuple, dict}
+        for cached in set(self._dispatch) - self._builtin_types:
+            del self._dispatch[cached]
+        for registered_type, registered_encoder in self._registered:
+            self._dispatch[registered_type] = self._bind(registered_encoder)
+
+    def _bind(self, encoder):
+        # Binds an encoder(packer, obj) to this packer, counted as the
+        # "registered" path when there are stats.
+        bound = partial(encoder, self)
+        if self.stats is not None:
+            bound = self._instrument("_pack_registered", bound)
+        return bound
+
+    def _notify(self):
+        # Called by the pack methods after each value they were given.
+        stats = self.stats
+        if stats is not None and stats.hook is not None:
+            stats.hook(stats)
 
     def pack(self, obj) -> bytes:
         self._buffer = BytesIO()
         self._pack(obj)
+        self._notify()
         return self._buffer.getvalue()
 
+    def pack_with(self, encoder, obj) -> bytes:
+        # Packs obj with an encoder(packer, obj) instead of the dispatch table,
+        # for values whose type cannot be registered (e.g. TypedDict records).
+        self._buffer = BytesIO()
+        self._bind(encoder)(obj)
+        self._notify()
+        return self._buffer.getvalue()
+
+    def pack_many(self, objs):
+        # Packs objs back to back into one buffer. offsets[i] is where object i
+        # starts and offsets[-1] is the total size, so object i is
+        # packed[offsets[i] : offsets[i + 1]].
+        buffer = self._buffer = BytesIO()
+        offsets = array("Q", [0])
+        pack = self._pack
+        tell = buffer.tell
+        append = offsets.append
+        notify = self._notify
+        for obj in objs:
+            pack(obj)
+            append(tell())
+            notify()
+        return buffer.getvalue(), offsets
+
+    def pack_into(self, obj, buffer: bytearray = None, offset=0) -> int:
+        # Overwrites buffer from offset onwards, growing it only when the
+        # encoded value does not fit. A buffer shorter than offset is first
+        # padded with zero bytes up to it, e.g. to leave room for a length
+        # prefix. Without a buffer, the packer's own one is reused. Returns
+        # the number of bytes written.
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        writer = self._writer
+        # A caller's buffer is used for this call only.
+        out = self._out = buffer if buffer is not None else self._own_out
+        if offset > len(out):
+            out.extend(bytes(offset - len(out)))
+        writer.buffer = out
+        writer.pos = self._out_start = offset
+        self._buffer = writer
+        self._pack(obj)
+        self._notify()
+        return writer.pos - offset
+
+    def packed_size(self, obj) -> int:
+        # The exact number of bytes pack(obj) returns, worked out from the same
+        # format rules without encoding anything. Values of registered types,
+        # and of other types without a size rule, are encoded to measure them.
+        # Containers are walked with an explicit stack, as in _walk.
+        registered = {typ for typ, _ in self._registered}
+        float_size = 5 if self._using_single_float else 9
+        size = 0
+        stack = [iter((obj,))]
+        while stack:
+            for obj in stack[-1]:
+                typ = type(obj)
+                if typ in registered:
+                    size += self._measure(obj)
+                elif typ is int:
+                    size += _int_size(obj)
+                elif typ is str:
+                    # ASCII is one byte per character, so skip the encode.
+                    byte_len = len(obj) if obj.isascii() else len(obj.encode("utf-8"))
+                    size += _str_header_size(byte_len) + byte_len
+                elif typ is float:
+                    if self._auto_single_float and _is_float32(obj):
+                        size += 5
+                    else:
+                        size += float_size
+                elif typ is dict:
+                    size += _container_header_size(len(obj), "Map")
+                    stack.append(chain.from_iterable(obj.items()))
+                    break
+                elif typ is list or typ is tuple:
+                    size += _container_header_size(len(obj), "List")
+                    items_size = self._numbers_size(obj, float_size)
+                    if items_size is not None:
+                        size += items_size
+                        continue
+                    stack.append(iter(obj))
+                    break
+                elif typ is bool or obj is None:
+                    size += 1
+                elif typ is bytes or typ is bytearray:
+                    size += _bin_header_size(len(obj)) + len(obj)
+                elif typ is memoryview:
+                    size += _bin_header_size(obj.nbytes) + obj.nbytes
+                elif typ is ExtType:
+                    header = self.pack_ext_header(obj.code, len(obj.data))
+                    size += len(header) + len(obj.data)
+                elif typ is Raw:
+                    size += len(obj.data)
+                else:
+                    size += self._measure(obj)
+            else:
+                stack.pop()
+        return size
+
+    def _numbers_size(self, obj, float_size: int):
+        # Size of the items of obj when they can be sized all at once, as in
+        # _try_bulk_numbers; otherwise None.
+        if not self._bulk_numbers or len(obj) < 16:
+            return None
+        item_type = type(obj[0])
+        if item_type is not float and item_type is not int:
+            return None
+        if len(set(map(type, obj))) != 1:
+            return None
+        if item_type is float:
+            if self._auto_single_float:
+                return len(obj) * 9 - sum(map(eq, array("f", obj), obj)) * 4
+            return len(obj) * float_size
+        int_format = _int_format(min(obj), max(obj))
+        if int_format is None:
+            return None
+        marker, code = int_format
+        return len(obj) * (len(marker) + struct.calcsize(code))
+
+    def _measure(self, obj) -> int:
+        # Measuring is not packing, so it leaves the stats as they were.
+        stats = self.stats
+        if stats is not None:
+            counters = (stats.counts, stats.bytes, stats.seconds)
+            saved = [dict(counter) for counter in counters], stats.saved_bytes
+        buffer = self._buffer
+        self._buffer = measured = BytesIO()
+        try:
+            self._pack(obj)
+        finally:
+            self._buffer = buffer
+            if stats is not None:
+                for counter, values in zip(counters, saved[0]):
+                    counter.clear()
+                    counter.update(values)
+                stats.saved_bytes = saved[1]
+        return measured.tell()
+
+    def pack_exact(self, obj) -> bytes:
+        # Same as pack(), but the output is allocated once at packed_size(obj)
+        # and written in place: a BytesIO that solely owns its initial bytes
+        # overwrites them without copying, and getvalue() returns them as is.
+        # The sizing pass makes it slower than pack(); in exchange, peak
+        # memory for a large output is somewhat lower, as the buffer is never
+        # over-allocated while growing.
+        self._buffer = BytesIO(bytes(self.packed_size(obj)))
+        self._pack(obj)
+        self._notify()
+        return self._buffer.getvalue()
+
+    def pack_segments(self, obj, threshold=4096) -> list:
+        # Packs obj into a list of buffers whose concatenation is pack(obj),
+        # ready for sock.sendmsg(segments) or os.writev(fd, segments). Bin,
+        # str and ext data of at least threshold bytes are referenced rather
+        # than copied, so bytearrays and memoryviews in obj must not change
+        # until the segments have been sent. Each large value adds up to two
+        # segments; the OS caps how many one call accepts (IOV_MAX).
+        writer = self._buffer = _SegmentWriter(threshold)
+        self._pack(obj)
+        self._notify()
+        return writer.getvalue()
+
+    def pack_spooled(self, obj, max_memory=64 * 1024 * 1024, dir=None):
+        # Packs obj into a file object rewound to the start, holding at most
+        # max_memory bytes of output in memory: a BytesIO if the output fits,
+        # otherwise a temporary file in dir (deleted once closed), which can
+        # be read in place with mmap.mmap(fp.fileno(), 0, access=ACCESS_READ).
+        writer = self._buffer = _SpillWriter(max_memory, dir)
+        try:
+            self._pack(obj)
+        except BaseException:
+            writer.file.close()
+            raise
+        self._notify()
+        writer.file.seek(0)
+        return writer.file
+
+    def pack_array_header(self, n: int) -> bytes:
+        if n <= 0xF:
+            return (0x90 + n).to_bytes(1, byteorder="big")
+        elif n <= 0xFFFF:
+            return b"\xdc" + n.to_bytes(2, byteorder="big")
+        elif n <= 0xFFFFFFFF:
+            return b"\xdd" + n.to_bytes(4, byteorder="big")
+        raise ValueError("List is too long to pack")
+
+    def pack_map_header(self, n: int) -> bytes:
+        if n <= 0xF:
+            return (0x80 + n).to_bytes(1, byteorder="big")
+        elif n <= 0xFFFF:
+            return b"\xde" + n.to_bytes(2, byteorder="big")
+        elif n <= 0xFFFFFFFF:
+            return b"\xdf" + n.to_bytes(4, byteorder="big")
+        raise ValueError("Map is too long to pack")
+
+    def pack_ext_header(self, code: int, size: int) -> bytes:
+        if not -0x80 <= code <= 0x7F:
+            raise ValueError("Ext type code is out of range")
+        code_byte = code.to_bytes(1, byteorder="big", signed=True)
+        if size in _fix_ext_markers:
+            return _fix_ext_markers[size] + code_byte
+        elif size <= 0xFF:
+            return b"\xc7" + size.to_bytes(1, byteorder="big") + code_byte
+        elif size <= 0xFFFF:
+            return b"\xc8" + size.to_bytes(2, byteorder="big") + code_byte
+        elif size <= 0xFFFFFFFF:
+            return b"\xc9" + size.to_bytes(4, byteorder="big") + code_byte
+        raise ValueError("Ext data is too long to pack")
+
+    def pack_stream(self, iterable, fp, count=None, chunk_size=65536) -> int:
+        # Writes each item of iterable to fp (anything with write() or a
+        # socket) as it is produced, flushing whenever chunk_size bytes are
+        # pending. With count, the items are framed as one array of that
+        # length; otherwise they are written back to back as separate
+        # objects. Returns the number of bytes written.
+        write = fp.sendall if hasattr(fp, "sendall") else fp.write
+        writer = self._buffer = _BufferWriter(bytearray())
+        total = 0
+        if count is not None:
+            writer.write(self.pack_array_header(count))
+        written = 0
+        for item in iterable:
+            if written == count:
+                raise ValueError("Iterable has more than %d items" % count)
+            self._pack(item)
+            self._notify()
+            written += 1
+            if writer.pos >= chunk_size:
+                total += self._flush_writer(writer, write)
+        if count is not None and written != count:
+            raise ValueError("Expected %d items, got %d" % (count, written))
+        return total + self._flush_writer(writer, write)
+
+    def _flush_writer(self, writer, write) -> int:
+        size = writer.pos
+        if size:
+            with memoryview(writer.buffer) as view:
+                write(view[:size])
+            writer.pos = 0
+        return size
+
+    def getbuffer(self) -> memoryview:
+        # The bytes written by the last pack_into() call. Release the view
+        # before the next call, as an exported bytearray cannot be resized.
+        return memoryview(self._out)[self._out_start : self._writer.pos]
+
     def _pack(self, obj):
-        if obj is None:
-            self._pack_none(obj)
-        elif isinstance(obj, bool):
-            self._pack_bool(obj)
-        elif isinstance(obj, int):
-            self._pack_int(obj)
-        elif isinstance(obj, float):
-            self._pack_float(obj)
-        elif isinstance(obj, str):
-            self._pack_str(obj)
-        elif isinstance(obj, (bytes, bytearray)):
-            self._pack_bytes(obj)
-        elif isinstance(obj, (list, tuple)):
-            self._pack_array(obj)
-        elif isinstance(obj, dict):
-            self._pack_map(obj)
+        try:
+            encoder = self._dispatch[type(obj)]
+        except KeyError:
+            encoder = self._lookup(type(obj))
+        encoder(obj)
+
+    def _walk(self, obj):
+        # Same output as the recursive _pack, but lists, tuples, dicts and
+        # their subclasses are walked with an explicit stack of item
+        # iterators, so nesting depth is limited only by max_depth rather than
+        # the interpreter stack. Values packed by an encoder are counted as
+        # one level, and any _walk they start carries on from that depth.
+        dispatch = self._dispatch
+        lookup = self._lookup
+        inline = self._inline_containers
+        write = self._buffer.write
+        custom_keys = self._encode_key != self._pack
+        base = self._depth
+        limit = None
+        if self._max_depth is not None:
+            limit = self._max_depth + 1 - base
+            if limit < 1:
+                raise ValueError("Object is nested deeper than %d" % self._max_depth)
+        stack = [iter((obj,))]
+        try:
+            while stack:
+                for obj in stack[-1]:
+                    typ = type(obj)
+                    if typ not in inline:
+                        try:
+                            encoder = dispatch[typ]
+                        except KeyError:
+                            encoder = lookup(typ)
+                            if typ in inline:
+                                # A container subclass seen for the first
+                                # time; later ones are walked inline.
+                                self._depth = base + len(stack) - 1
+                                self._walk(obj)
+                                continue
+                        self._depth = base + len(stack)
+                        encoder(obj)
+                        continue
+                    is_map = isinstance(obj, dict)
+                    if not is_map and self._try_bulk_numbers(obj):
+                        continue
+                    if len(stack) == limit:
+                        raise ValueError(
+                            "Object is nested deeper than %d" % self._max_depth
+                        )
+                    if not is_map:
+                        write(self.pack_array_header(len(obj)))
+                        stack.append(iter(obj))
+                    elif custom_keys:
+                        write(self.pack_map_header(len(obj)))
+                        stack.append(self._keyed_values(obj, base + len(stack)))
+                    else:
+                        write(self.pack_map_header(len(obj)))
+                        stack.append(chain.from_iterable(obj.items()))
+                    break
+                else:
+                    stack.pop()
+        finally:
+            self._depth = base
+
+    def _keyed_values(self, obj, depth: int):
+        # Yields the values of obj for _walk, writing each key with
+        # _encode_key just before its value is walked.
+        encode_key = self._encode_key
+        for key, value in obj.items():
+            self._depth = depth
+            encode_key(key)
+            yield value
+
+    def _lookup(self, typ):
+        for registered_type, registered_encoder in self._registered:
+            if issubclass(typ, registered_type):
+                encoder = self._bind(registered_encoder)
+                break
         else:
-            raise TypeError("Cannot pack object of type %s" % type(obj))
+            for base_type, name in self._fallback_types:
+                if issubclass(typ, base_type):
+                    encoder = getattr(self, name)
+                    if name in ("_pack_array", "_pack_map") and self._inline_containers:
+                        # Let the iterative encoder walk subclasses too.
+                        self._inline_containers.add(typ)
+                    break
+            else:
+                # NumPy is only supported if the caller has already imported
+                # it, so pure-Python users never pay for the import.
+                numpy = sys.modules.get("numpy")
+                if numpy is None or not issubclass(typ, numpy.ndarray):
+                    raise TypeError("Cannot pack object of type %s" % typ)
+                encoder = self._pack_ndarray
+        self._dispatch[typ] = encoder
+        return encoder
+
+    def _instrument(self, name, method):
+        stats = self.stats
+        path = name[len("_pack_") :]
+        nested_bytes = self._nested_bytes
+
+        def instrumented(obj, *args):
+            tell = self._buffer.tell
+            start = tell()
+            if stats.timing:
+                started = perf_counter()
+            nested_bytes.append(0)
+            try:
+                method(obj, *args)
+            finally:
+                nested = nested_bytes.pop()
+            written = tell() - start
+            stats.counts[path] = stats.counts.get(path, 0) + 1
+            stats.bytes[path] = stats.bytes.get(path, 0) + written - nested
+            if stats.timing:
+                elapsed = perf_counter() - started
+                stats.seconds[path] = stats.seconds.get(path, 0.0) + elapsed
+            if nested_bytes:
+                nested_bytes[-1] += written
+
+        return instrumented
 
     def _pack_int(self, obj: int):
         if 0 <= obj < 0x80:
@@ -105,6 +875,10 @@ class Packer:
     def _pack_float(self, obj: float):
         if self._using_single_float:
             self._pack_single_float(obj)
+        elif self._auto_single_float and _is_float32(obj):
+            self._pack_single_float(obj)
+            if self.stats is not None:
+                self.stats.saved_bytes += 4
         else:
             self._pack_double_float(obj)
 
@@ -130,6 +904,29 @@ class Packer:
         elif byte_len <= 0xFFFFFFFF:
             self._pack_str32(byte_str)
 
+    def _pack_str_cached(self, obj: str):
+        cache = self.str_cache
+        if len(obj) > cache.max_length:
+            self._pack_str(obj)
+            return
+        encoded = cache.get(obj)
+        if encoded is None:
+            byte_str = obj.encode("utf-8")
+            encoded = self._str_header(len(byte_str)) + byte_str
+            cache.put(obj, encoded)
+        self._buffer.write(encoded)
+
+    def _str_header(self, byte_len: int) -> bytes:
+        if byte_len <= 0x1F:
+            return (0xA0 + byte_len).to_bytes(1, byteorder="big")
+        elif byte_len <= 0xFF:
+            return b"\xd9" + byte_len.to_bytes(1, byteorder="big")
+        elif byte_len <= 0xFFFF:
+            return b"\xda" + byte_len.to_bytes(2, byteorder="big")
+        elif byte_len <= 0xFFFFFFFF:
+            return b"\xdb" + byte_len.to_bytes(4, byteorder="big")
+        raise ValueError("String is too long to pack")
+
     def _pack_fix_str(self, byte_str: bytes):
         self._buffer.write((0xA0 + len(byte_str)).to_bytes(1, byteorder="big"))
         self._buffer.write(byte_str)
@@ -149,7 +946,10 @@ class Packer:
         self._buffer.write(len(byte_str).to_bytes(4, byteorder="big"))
         self._buffer.write(byte_str)
 
-    def _pack_bytes(self, obj: bytes | bytearray):
+    def _pack_bytes(self, obj: bytes | bytearray | memoryview):
+        if type(obj) is memoryview:
+            # Packed as its raw bytes; only non-contiguous views are copied.
+            obj = obj.cast("B") if obj.c_contiguous else obj.tobytes()
         byte_len = len(obj)
         if byte_len > 0xFFFFFFFF:
             raise ValueError("Bytes is too long to pack")
@@ -176,6 +976,8 @@ class Packer:
         self._buffer.write(obj)
 
     def _pack_array(self, obj):
+        if self._try_bulk_numbers(obj):
+            return
         list_len = len(obj)
         if list_len > 0xFFFFFFFF:
             raise ValueError("List is too long to pack")
@@ -186,22 +988,119 @@ class Packer:
         elif list_len <= 0xFFFFFFFF:
             self._pack_array32(obj)
 
+    def _try_bulk_numbers(self, obj) -> bool:
+        # Packs obj in bulk and returns True if it is a long enough list or
+        # tuple of only floats, or of only ints sharing one int format.
+        if not self._bulk_numbers or len(obj) < 16:
+            return False
+        item_type = type(obj[0])
+        if item_type is not float and item_type is not int:
+            return False
+        if len(set(map(type, obj))) != 1:
+            return False
+        if item_type is float:
+            self._pack_float_list(obj)
+            return True
+        int_format = _int_format(min(obj), max(obj))
+        if int_format is None:
+            return False
+        self._pack_int_list(obj, int_format)
+        return True
+
+    def _pack_float_list(self, obj):
+        code = "f" if self._using_single_float else "d"
+        if self._auto_single_float:
+            # Converted to float32 in one go, then compared item by item.
+            exact = sum(map(eq, array("f", obj), obj))
+            if exact == len(obj):
+                code = "f"
+                if self.stats is not None:
+                    self.stats.saved_bytes += 4 * exact
+            elif exact:
+                # Mixed: each float gets its own format.
+                self._buffer.write(self.pack_array_header(len(obj)))
+                pack_float = self._pack_float
+                for item in obj:
+                    pack_float(item)
+                return
+        self._write_numbers(
+            len(obj), struct.pack(">%d%s" % (len(obj), code), *obj), code
+        )
+
+    def _pack_int_list(self, obj, int_format):
+        marker, code = int_format
+        self._write_numbers(
+            len(obj), struct.pack(">%d%s" % (len(obj), code), *obj), code, marker
+        )
+
+    def _write_numbers(self, n: int, body: bytes, code: str, marker=None):
+        # Writes an array of n numbers whose big-endian values are packed back
+        # to back in body, adding the format marker in front of each one.
+        if marker is None:
+            marker = b"\xca" if code == "f" else b"\xcb"
+        self._buffer.write(self.pack_array_header(n))
+        self._buffer.write(_interleave(marker, body, struct.calcsize(code)))
+
+    def _pack_typed_array(self, obj: array):
+        code = obj.typecode
+        if code == "d" and self._auto_single_float:
+            self._pack_float_list(obj)
+        elif code in "fd":
+            if self._using_single_float:
+                code = "f"
+            values = array(code, obj)
+            if sys.byteorder == "little":
+                values.byteswap()
+            self._write_numbers(len(values), values.tobytes(), code)
+        elif code in "bBhHiIlLqQ" and obj:
+            int_format = _int_format(min(obj), max(obj))
+            if int_format is None:
+                self._pack_array(obj.tolist())
+            else:
+                self._pack_int_list(obj, int_format)
+        else:
+            self._pack_array(obj.tolist())
+
+    def _pack_ndarray(self, obj):
+        kind = obj.dtype.kind
+        if obj.ndim != 1 or not (kind in "iu" or kind == "f" and obj.itemsize >= 4):
+            self._pack(obj.tolist())
+            return
+        if kind == "f" and obj.itemsize == 8 and self._auto_single_float:
+            # Same per-value float32 round-trip check as lists and array("d").
+            self._pack_float_list(obj.tolist())
+            return
+        if kind == "f":
+            code = "f" if self._using_single_float or obj.itemsize == 4 else "d"
+            self._write_numbers(len(obj), obj.astype(">" + code).tobytes(), code)
+            return
+        int_format = _int_format(int(obj.min()), int(obj.max())) if len(obj) else None
+        if int_format is None:
+            self._pack(obj.tolist())
+            return
+        marker, code = int_format
+        dtype = ">%s%d" % ("u" if code.isupper() else "i", struct.calcsize(code))
+        self._write_numbers(len(obj), obj.astype(dtype).tobytes(), code, marker)
+
     def _pack_fix_array(self, obj):
         self._buffer.write((0x90 + len(obj)).to_bytes(1, byteorder="big"))
+        pack = self._pack
         for item in obj:
-            self._pack(item)
+            pack(item)
 
     def _pack_array16(self, obj):
         self._buffer.write(b"\xdc")
         self._buffer.write(len(obj).to_bytes(2, byteorder="big"))
+        pack = self._pack
         for item in obj:
-            self._pack(item)
+            pack(item)
 
     def _pack_array32(self, obj):
         self._buffer.write(b"\xdd")
         self._buffer.write(len(obj).to_bytes(4, byteorder="big"))
+        pack = self._pack
         for item in obj:
-            self._pack(item)
+            pack(item)
 
     def _pack_map(self, obj):
         map_len = len(obj)
@@ -216,23 +1115,36 @@ class Packer:
 
     def _pack_fix_map(self, obj):
         self._buffer.write((0x80 + len(obj)).to_bytes(1, byteorder="big"))
+        pack = self._pack
+        pack_key = self._encode_key
         for key, value in obj.items():
-            self._pack(key)
-            self._pack(value)
+            pack_key(key)
+            pack(value)
 
     def _pack_map16(self, obj):
         self._buffer.write(b"\xde")
         self._buffer.write(len(obj).to_bytes(2, byteorder="big"))
+        pack = self._pack
+        pack_key = self._encode_key
         for key, value in obj.items():
-            self._pack(key)
-            self._pack(value)
+            pack_key(key)
+            pack(value)
 
     def _pack_map32(self, obj):
         self._buffer.write(b"\xdf")
         self._buffer.write(len(obj).to_bytes(4, byteorder="big"))
+        pack = self._pack
+        pack_key = self._encode_key
         for key, value in obj.items():
-            self._pack(key)
-            self._pack(value)
+            pack_key(key)
+            pack(value)
+
+    def _pack_ext_type(self, obj: ExtType):
+        self._buffer.write(self.pack_ext_header(obj.code, len(obj.data)))
+        self._buffer.write(obj.data)
+
+    def _pack_raw(self, obj: Raw):
+        self._buffer.write(obj.data)
 
     def _pack_bool(self, obj: bool):
         if obj is True:
@@ -242,3 +1154,69 @@ class Packer:
 
     def _pack_none(self, obj):
         self._buffer.write(b"\xc0")
+
+
+# Subclass types a pooled packer may cache before its cache is cleared.
+_POOL_MAX_LOOKUPS = 256
+
+
+class PackerPool:
+    # Keeps one warm Packer per thread, so any number of threads can share
+    # the pool without ever sharing a packer. factory() builds each packer,
+    # e.g. to register encoders or attach a StrCache of its own; by default
+    # it is Packer(using_single_float=...). A packer is taken out of the
+    # pool while in use, so a nested call on the same thread (from a
+    # registered encoder, say) builds a fresh one instead of clobbering it.
+    def __init__(self, factory=None, using_single_float=False):
+        if factory is None:
+            factory = partial(Packer, using_single_float=using_single_float)
+        self._factory = factory
+        self._local = threading.local()
+
+    def pack(self, obj) -> bytes:
+        packer = self._acquire()
+        try:
+            return packer.pack(obj)
+        finally:
+            self._release(packer)
+
+    def pack_many(self, objs):
+        packer = self._acquire()
+        try:
+            return packer.pack_many(objs)
+        finally:
+            self._release(packer)
+
+    @contextmanager
+    def packer(self):
+        # For the rest of the Packer API, e.g. pack_into() and getbuffer().
+        # The packer must not be used after the with block.
+        packer = self._acquire()
+        try:
+            yield packer
+        finally:
+            self._release(packer)
+
+    def _acquire(self) -> Packer:
+        local = self._local
+        packer = getattr(local, "packer", None)
+        if packer is None:
+            return self._factory()
+        local.packer = None
+        return packer
+
+    def _release(self, packer: Packer):
+        # Drop the last output so an idle packer does not keep it alive; the
+        # pack_into() buffer is kept, as it is meant to be reused. Packers
+        # live as long as their thread, so once they have cached more than
+        # _POOL_MAX_LOOKUPS subclass types, e.g. from namedtuple classes
+        # created on the fly, the cache is cleared rather than keep them all.
+        packer._buffer = None
+        cached = len(packer._dispatch) - len(packer._builtin_types)
+        if cached - len(packer._registered) > _POOL_MAX_LOOKUPS:
+            packer._clear_lookups()
+        self._local.packer = packer
+
+
+# Used by the module-level pack() and pack_many().
+_default_pools = {False: PackerPool(), True: PackerPool(using_single_float=True)}
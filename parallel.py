@@ -0,0 +1,53 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from pack import Packer
+
+
+def pack_parallel(
+    obj, workers=None, chunk_size=10000, using_single_float=False, executor=None
+) -> bytes:
+    # Packs a large top-level list or tuple by encoding chunks of its items in
+    # worker processes and joining them behind one array header. The result
+    # is byte-identical to pack(obj). Pass an existing executor to avoid
+    # starting a new process pool on every call.
+    header = Packer().pack_array_header(len(obj))
+    parts = _map_chunks(
+        _pack_items, obj, workers, chunk_size, using_single_float, executor
+    )
+    return b"".join([header, *parts])
+
+
+def pack_many_parallel(
+    objs, workers=None, chunk_size=10000, using_single_float=False, executor=None
+):
+    # Parallel counterpart of pack_many(): returns the packed buffer and an
+    # array('Q') of offsets, identical to the serial result.
+    packed = []
+    offsets = array("Q", [0])
+    for part, part_offsets in _map_chunks(
+        _pack_many_items, objs, workers, chunk_size, using_single_float, executor
+    ):
+        base = offsets[-1]
+        offsets.extend(offset + base for offset in part_offsets[1:])
+        packed.append(part)
+    return b"".join(packed), offsets
+
+
+def _map_chunks(func, items, workers, chunk_size, using_single_float, executor):
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if len(chunks) <= 1 or workers == 1:
+        return [func(chunk, using_single_float) for chunk in chunks]
+    if executor is not None:
+        return list(executor.map(func, chunks, repeat(using_single_float)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, chunks, repeat(using_single_float)))
+
+
+def _pack_items(items, using_single_float) -> bytes:
+    return Packer(using_single_float=using_single_float).pack_many(items)[0]
+
+
+def _pack_many_items(items, using_single_float):
+    return Packer(using_single_float=using_single_float).pack_many(items)
@@ -0,0 +1,147 @@
+import mmap
+import os
+import sys
+from array import array
+
+from pack import Packer
+from unpack import unpack
+
+# The side index is a flat array of unsigned 64-bit little-endian end offsets,
+# one per record: record n spans [end[n - 1], end[n]) of the data file.
+_INDEX_ITEM_SIZE = array("Q").itemsize
+
+
+def _index_path(path):
+    return str(path) + ".idx"
+
+
+class RecordWriter:
+    # Appends packed records to path and their end offsets to path + ".idx".
+    # A record's data is flushed before its index entry, so readers never see
+    # an entry for incomplete data; data left behind by an interrupted append
+    # is truncated away when the file is reopened.
+    def __init__(self, path, using_single_float=False):
+        self._packer = Packer(using_single_float=using_single_float)
+        self._data = open(path, "ab")
+        self._index = open(_index_path(path), "ab")
+        index_size = self._index.tell()
+        index_size -= index_size % _INDEX_ITEM_SIZE
+        self._index.truncate(index_size)
+        self._count = index_size // _INDEX_ITEM_SIZE
+        self._end = 0
+        if self._count:
+            with open(_index_path(path), "rb") as fp:
+                fp.seek(index_size - _INDEX_ITEM_SIZE)
+                self._end = _read_index(fp.read()).pop()
+        self._data.truncate(self._end)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, obj) -> int:
+        # Returns the record number of obj.
+        size = self._packer.pack_into(obj)
+        with self._packer.getbuffer() as view:
+            self._data.write(view)
+        self._end += size
+        self._write_index(array("Q", [self._end]))
+        return self._count - 1
+
+    def extend(self, objs):
+        packed, offsets = self._packer.pack_many(objs)
+        self._data.write(packed)
+        ends = array("Q", (self._end + offset for offset in offsets[1:]))
+        self._end += len(packed)
+        self._write_index(ends)
+
+    def _write_index(self, ends):
+        self._data.flush()
+        if sys.byteorder == "big":
+            ends.byteswap()
+        self._index.write(ends.tobytes())
+        self._index.flush()
+        self._count += len(ends)
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+
+def _read_index(data):
+    ends = array("Q")
+    ends.frombytes(data)
+    if sys.byteorder == "big":
+        ends.byteswap()
+    return ends
+
+
+class RecordReader:
+    # Random access to the records of a RecordWriter file through read-only
+    # memory maps, so any number of processes can read while one appends.
+    # refresh() picks up records appended after the reader was opened.
+    def __init__(self, path, zero_copy=False):
+        self._path = path
+        self._zero_copy = zero_copy
+        self._maps = []
+        self._ends = self._data = memoryview(b"")
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[i] for i in range(len(self))[n]]
+        return unpack(self.raw(n), zero_copy=self._zero_copy)
+
+    def raw(self, n) -> memoryview:
+        # The packed bytes of record n, as a view into the mapped file. Views
+        # handed out by raw() or zero_copy must be released before close().
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError("Record number out of range")
+        start = self._ends[n - 1] if n else 0
+        return self._data[start : self._ends[n]]
+
+    def refresh(self):
+        self.close()
+        # Map the index before the data: every indexed record was flushed to
+        # the data file before its entry, so the data map will cover it.
+        index_map = _map(_index_path(self._path))
+        data_map = _map(self._path)
+        self._maps = [index_map, data_map]
+        with memoryview(index_map) as index:
+            index = index[: len(index) - len(index) % _INDEX_ITEM_SIZE]
+            if sys.byteorder == "big":
+                self._ends = memoryview(_read_index(index))
+            else:
+                self._ends = index.cast("Q")
+        self._data = memoryview(data_map)
+
+    def close(self):
+        self._ends.release()
+        self._data.release()
+        for mapped in self._maps:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._maps = []
+
+
+def _map(path):
+    with open(path, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
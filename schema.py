@@ -0,0 +1,79 @@
+import dataclasses
+import typing
+
+from pack import Packer
+
+
+def compile_encoder(cls):
+    # Builds an encoder(packer, obj) that packs instances of cls as a map of
+    # its fields. The map header and every key are encoded once here, so the
+    # generated function only writes those constant chunks and packs the
+    # field values in order. Register it with Packer.register(), or use
+    # Packer.pack_with() for TypedDicts, whose instances are plain dicts.
+    if typing.is_typeddict(cls):
+        if cls.__optional_keys__:
+            raise TypeError(
+                "Cannot compile %s: optional keys %s"
+                % (cls.__name__, sorted(cls.__optional_keys__))
+            )
+        names = list(cls.__annotations__)
+        getters = ["obj[%r]" % name for name in names]
+    else:
+        fields = _fields(cls)
+        names = [name for name, _ in fields]
+        getters = ["obj.%s" % attribute for _, attribute in fields]
+
+    packer = Packer()
+    header = packer.pack_map_header(len(names))
+    lines = ["def encode(packer, obj):", "    write = packer._buffer.write"]
+    if names:
+        lines.append("    pack = packer._pack")
+        chunks = [packer.pack(name) for name in names]
+        chunks[0] = header + chunks[0]
+    else:
+        chunks = [header]
+        lines.append("    write(chunk_0)")
+    for i, getter in enumerate(getters):
+        lines.append("    write(chunk_%d)" % i)
+        lines.append("    pack(%s)" % getter)
+
+    namespace = {"chunk_%d" % i: chunk for i, chunk in enumerate(chunks)}
+    exec("\n".join(lines), namespace)
+    encode = namespace["encode"]
+    encode.__qualname__ = encode.__name__ = "encode_%s" % cls.__name__
+    return encode
+
+
+def _fields(cls):
+    # Returns (name, attribute) pairs. Private __slots__ names are stored
+    # mangled with the name of the class that declares them.
+    if dataclasses.is_dataclass(cls):
+        return [(field.name, field.name) for field in dataclasses.fields(cls)]
+    if issubclass(cls, tuple) and hasattr(cls, "_fields"):
+        return [(name, name) for name in cls._fields]
+    fields = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name in ("__dict__", "__weakref__"):
+                continue
+            attribute = name
+            owner = base.__name__.lstrip("_")
+            if name.startswith("__") and not name.endswith("__") and owner:
+                attribute = "_%s%s" % (owner, name)
+            if (name, attribute) in fields:
+                continue
+            if name in [field[0] for field in fields]:
+                raise TypeError(
+                    "Cannot compile %s: more than one slot named %s"
+                    % (cls.__name__, name)
+                )
+            fields.append((name, attribute))
+    if not fields:
+        raise TypeError(
+            "Cannot compile %s: not a dataclass, NamedTuple, TypedDict or "
+            "__slots__ class" % cls.__name__
+        )
+    return fields
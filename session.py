@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pack import ExtType, Packer
+from unpack import Unpacker, unpack
+
+# Ext codes of the in-band key table. A define carries a 2-byte big-endian
+# id followed by the UTF-8 key and stands for the key itself; a ref carries
+# just the id, in 1 byte below 256 and in 2 bytes otherwise.
+SYMBOL_DEFINE_CODE = 2
+SYMBOL_REF_CODE = 3
+
+
+class SessionPacker(Packer):
+    # Packs a stream of messages in which each str map key of min_length to
+    # max_length characters is sent in full once, as a define, and then as
+    # a ref to its id. At most maxsize keys are known at a time; the least
+    # recently used one is evicted and its id reused by the next define.
+    # Messages must reach the SessionUnpacker in the order they were packed.
+    # pack(), pack_many(), pack_into() and pack_segments() undo their
+    # defines if they fail; after any other failure, or to start a new
+    # stream, call reset() on both ends. With iterative=True, maps are still
+    # walked inline and their keys go through the table as they are reached.
+    def __init__(
+        self,
+        maxsize=1024,
+        min_length=3,
+        max_length=64,
+        define_code=SYMBOL_DEFINE_CODE,
+        ref_code=SYMBOL_REF_CODE,
+        **kwargs,
+    ):
+        if not 0 < maxsize <= 0x10000:
+            raise ValueError("maxsize must be between 1 and 65536")
+        super().__init__(**kwargs)
+        self.maxsize = maxsize
+        self.min_length = min_length
+        self.max_length = max_length
+        self._define_code = define_code
+        self._ref_code = ref_code
+        # key -> (id, encoded ref), least recently used first.
+        self._symbols = OrderedDict()
+        # (key, evicted entry or None) for each define of the current call.
+        self._journal = []
+        self._encode_key = self._encode_symbol
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def reset(self):
+        self._symbols.clear()
+
+    def pack(self, obj) -> bytes:
+        with self._atomic():
+            return super().pack(obj)
+
+    def pack_many(self, objs):
+        with self._atomic():
+            return super().pack_many(objs)
+
+    def pack_into(self, obj, buffer: bytearray = None, offset=0) -> int:
+        with self._atomic():
+            return super().pack_into(obj, buffer, offset)
+
+    def pack_segments(self, obj, threshold=4096) -> list:
+        with self._atomic():
+            return super().pack_segments(obj, threshold)
+
+    def packed_size(self, obj) -> int:
+        # Key encodings depend on the table, so obj is encoded to measure it
+        # and its defines are then undone.
+        with self._atomic(commit=False):
+            return self._measure(obj)
+
+    def pack_exact(self, obj) -> bytes:
+        # Sizing would encode obj twice, so this is just pack().
+        return self.pack(obj)
+
+    @contextmanager
+    def _atomic(self, commit=True):
+        self._journal = []
+        try:
+            yield
+        except BaseException:
+            self._rollback()
+            raise
+        if not commit:
+            self._rollback()
+
+    def _rollback(self):
+        symbols = self._symbols
+        for key, evicted in reversed(self._journal):
+            del symbols[key]
+            if evicted is not None:
+                evicted_key, entry = evicted
+                symbols[evicted_key] = entry
+                symbols.move_to_end(evicted_key, last=False)
+        self._journal = []
+
+    def _encode_symbol(self, key):
+        if type(key) is not str or not self.min_length <= len(key) <= self.max_length:
+            self._pack(key)
+            return
+        symbols = self._symbols
+        entry = symbols.get(key)
+        if entry is not None:
+            symbols.move_to_end(key)
+            self._buffer.write(entry[1])
+            return
+        evicted = None
+        if len(symbols) < self.maxsize:
+            symbol = len(symbols)
+        else:
+            evicted = symbols.popitem(last=False)
+            symbol = evicted[1][0]
+        size = 1 if symbol <= 0xFF else 2
+        ref = self.pack_ext_header(self._ref_code, size) + symbol.to_bytes(size, "big")
+        symbols[key] = (symbol, ref)
+        self._journal.append((key, evicted))
+        data = symbol.to_bytes(2, "big") + key.encode("utf-8")
+        self._buffer.write(self.pack_ext_header(self._define_code, len(data)))
+        self._buffer.write(data)
+
+
+class SessionUnpacker(Unpacker):
+    # Decodes the messages of a SessionPacker, fed in the order they were
+    # packed, keeping its key table in step. Defines and refs come back as
+    # the key strings; other ext values go to ext_hook as usual. unpack()
+    # decodes one complete message for transports that frame messages.
+    def __init__(
+        self,
+        ext_hook=None,
+        define_code=SYMBOL_DEFINE_CODE,
+        ref_code=SYMBOL_REF_CODE,
+    ):
+        super().__init__(ext_hook=self._resolve)
+        self._define_code = define_code
+        self._ref_code = ref_code
+        self._next_hook = ext_hook
+        self._symbols = {}
+
+    def unpack(self, data):
+        return unpack(data, ext_hook=self._resolve)
+
+    def reset(self):
+        self._symbols.clear()
+
+    def _resolve(self, code, data):
+        if code == self._ref_code:
+            symbol = int.from_bytes(data, "big")
+            try:
+                return self._symbols[symbol]
+            except KeyError:
+                raise ValueError("Undefined key symbol %d" % symbol) from None
+        if code == self._define_code:
+            key = str(data[2:], "utf-8")
+            self._symbols[int.from_bytes(data[:2], "big")] = key
+            return key
+        if self._next_hook is None:
+            return ExtType(code, data)
+        return self._next_hook(code, data)
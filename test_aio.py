@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from aio import AsyncPackWriter, AsyncUnpacker
+from pack import pack
+
+MESSAGES = [{"id": i, "body": "t" * (i % 50)} for i in range(500)]
+
+
+async def _round_trip(messages, **writer_options):
+    received = []
+    done = asyncio.Event()
+
+    async def handle(reader, writer):
+        async for obj in AsyncUnpacker(reader, read_size=128):
+            received.append(obj)
+        writer.close()
+        done.set()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writes = []
+        write = writer.write
+        writer.write = lambda data: (writes.append(len(data)), write(data))
+        packer = AsyncPackWriter(writer, **writer_options)
+        for message in messages:
+            await packer.write(message)
+        await packer.close()
+        await done.wait()
+    return received, writes
+
+
+def test_round_trip_coalesced():
+    received, writes = asyncio.run(_round_trip(MESSAGES, max_bytes=4096))
+
+    assert received == MESSAGES
+    assert len(writes) < len(MESSAGES) / 10
+    assert sum(writes) == sum(len(pack(message)) for message in MESSAGES)
+
+
+def test_flush_after_delay():
+    async def main():
+        received = asyncio.Queue()
+
+        async def handle(reader, writer):
+            async for obj in AsyncUnpacker(reader):
+                await received.put(obj)
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        async with server:
+            _, writer = await asyncio.open_connection(
+                *server.sockets[0].getsockname()[:2]
+            )
+            packer = AsyncPackWriter(writer, max_delay=0.01)
+            await packer.write({"a": 1})
+            ret = await asyncio.wait_for(received.get(), 1)
+            await packer.close()
+            return ret
+
+    assert asyncio.run(main()) == {"a": 1}
+
+
+def test_unpacker_truncated_stream_fail():
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(pack([1, 2]) + pack("test")[:2])
+        reader.feed_eof()
+        return [obj async for obj in AsyncUnpacker(reader)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_write_fail_leaves_no_partial_data():
+    class Writer:
+        def __init__(self):
+            self.data = b""
+
+        def write(self, data):
+            self.data += data
+
+        async def drain(self):
+            pass
+
+    async def main():
+        writer = Writer()
+        packer = AsyncPackWriter(writer, max_delay=10)
+        await packer.write("first")
+        with pytest.raises(TypeError):
+            await packer.write({"abc": object()})
+        await packer.write(1)
+        await packer.flush()
+        return writer.data
+
+    ret = asyncio.run(main())
+
+    assert ret == pack("first") + pack(1)
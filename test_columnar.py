@@ -0,0 +1,86 @@
+import pytest
+
+import msgpack
+from columnar import ColumnRows, pack_columns, unpack_columns
+from pack import Packer, pack
+
+RECORDS = [
+    {"id": i, "name": "row%d" % i, "score": i / 4, "tags": ["a"] * (i % 3)}
+    for i in range(100)
+]
+FLAT_RECORDS = [{"id": i, "name": "row%d" % i, "score": i / 4} for i in range(100)]
+
+
+def test_pack_columns():
+    ret = pack_columns(RECORDS)
+
+    assert msgpack.unpackb(ret) == {
+        "id": list(range(100)),
+        "name": ["row%d" % i for i in range(100)],
+        "score": [i / 4 for i in range(100)],
+        "tags": [["a"] * (i % 3) for i in range(100)],
+    }
+    assert len(ret) < len(pack(RECORDS))
+
+
+def test_pack_columns_packer():
+    packer = Packer(using_single_float=True)
+
+    ret = pack_columns([{"x": 0.5}, {"x": 1.5}], packer=packer)
+
+    assert ret == msgpack.packb({"x": [0.5, 1.5]}, use_single_float=True)
+
+
+# Lazy columns return nested containers as views, so only flat records
+# compare equal in both modes.
+@pytest.mark.parametrize("test_input", [[], [{"a": 1}], FLAT_RECORDS])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_unpack_columns(test_input, lazy):
+    ret = unpack_columns(pack_columns(test_input), lazy=lazy)
+
+    assert isinstance(ret, ColumnRows)
+    assert len(ret) == len(test_input)
+    assert list(ret) == test_input
+    if test_input:
+        assert ret[-1] == test_input[-1]
+        assert ret[1:3] == test_input[1:3]
+
+
+def test_unpack_columns_nested():
+    ret = unpack_columns(pack_columns(RECORDS))
+
+    assert list(ret) == RECORDS
+
+
+def test_unpack_columns_lazy_values():
+    ret = unpack_columns(pack_columns(RECORDS), lazy=True)
+
+    assert ret[5]["name"] == "row5"
+    assert list(ret[5]["tags"]) == ["a", "a"]
+
+
+def test_unpack_columns_index_fail():
+    ret = unpack_columns(pack_columns(RECORDS))
+
+    with pytest.raises(IndexError):
+        ret[100]
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        [{"a": 1}, {"b": 2}],
+        [{"a": 1, "b": 2}, {"a": 1}],
+        [{"a": 1}, {"a": 1, "b": 2}],
+        [{}],
+    ],
+)
+def test_pack_columns_keys_fail(test_input):
+    with pytest.raises(ValueError):
+        pack_columns(test_input)
+
+
+@pytest.mark.parametrize("data", [pack([1, 2]), pack({"a": [1], "b": [1, 2]})])
+def test_unpack_columns_fail(data):
+    with pytest.raises(ValueError):
+        unpack_columns(data)
@@ -0,0 +1,110 @@
+import pytest
+
+import msgpack
+from demo import data as demo_data
+from lazy import LazyArray, LazyMap, lazy_unpack
+from pack import ExtType, pack
+from unpack import unpack
+
+
+def _materialize(obj):
+    if isinstance(obj, LazyMap):
+        return {key: _materialize(value) for key, value in obj.items()}
+    if isinstance(obj, LazyArray):
+        return [_materialize(item) for item in obj]
+    return obj
+
+
+@pytest.mark.parametrize("index", [True, False])
+def test_lazy_demo(index):
+    ret = lazy_unpack(pack(demo_data), index=index)
+
+    assert isinstance(ret, LazyMap)
+    assert len(ret) == len(demo_data)
+    assert list(ret) == list(demo_data)
+    assert ret["age"] == 25
+    assert isinstance(ret["hobbies"], LazyArray)
+    assert ret["hobbies"][2]["location"] == "mountain"
+    assert ret["hobbies"][-1] == 3.14
+    assert ret["hobbies"][:2] == ["reading", "painting"]
+    assert ret["address"]["zip"] == "67890"
+    assert _materialize(ret) == demo_data
+
+
+@pytest.mark.parametrize("index", [True, False])
+def test_lazy_missing(index):
+    ret = lazy_unpack(pack({"a": [1, 2]}), index=index)
+
+    assert "b" not in ret
+    with pytest.raises(KeyError):
+        ret["b"]
+    with pytest.raises(IndexError):
+        ret["a"][2]
+
+
+def test_lazy_skips_siblings():
+    data = {"blob": b"x" * 100000, "rows": [[i, "t" * i] for i in range(100)], "k": 1}
+    packed = bytearray(pack(data))
+    blob = packed.index(b"x" * 100000)
+    # Corrupting a skipped payload must not affect lookups of other keys.
+    packed[blob : blob + 100000] = b"\xc1" * 100000
+
+    ret = lazy_unpack(packed)
+
+    assert ret["k"] == 1
+    assert list(ret["rows"][99]) == [99, "t" * 99]
+
+
+def test_lazy_index_cached():
+    ret = lazy_unpack(pack(list(range(1000))))
+
+    assert ret[500] == 500
+    assert len(ret._offsets) == 1000
+    assert ret[999] == 999
+
+
+def test_lazy_duplicate_key():
+    packed = b"\x82\xa1a\x01\xa1a\x02"
+
+    assert lazy_unpack(packed)["a"] == unpack(packed)["a"] == 2
+    assert lazy_unpack(packed, index=False)["a"] == 1
+
+
+def test_lazy_unindexed_lookup_stops_at_key():
+    # The value after "a" is truncated, so a full scan would fail.
+    packed = b"\x82\xa1a\x01\xa1b\xdd\xff\xff\xff\xff"
+
+    assert lazy_unpack(packed, index=False)["a"] == 1
+
+
+def test_lazy_scalar_and_tuple_key():
+    assert lazy_unpack(pack("test")) == "test"
+    assert lazy_unpack(msgpack.packb({(1, 2): "t"}))[(1, 2)] == "t"
+
+
+def test_lazy_zero_copy():
+    ret = lazy_unpack(pack({"b": b"t" * 300}), zero_copy=True)
+
+    assert isinstance(ret["b"], memoryview)
+
+
+def test_lazy_extra_data_fail():
+    with pytest.raises(ValueError):
+        lazy_unpack(pack([1]) + pack(2), validate=True)
+
+
+@pytest.mark.parametrize("data", [b"\xdc\x00", b"\xdd\x00\x00", b"\x91\xde\x00"])
+def test_lazy_truncated_header_fail(data):
+    with pytest.raises(ValueError):
+        lazy_unpack(data, validate=True)
+
+
+def test_lazy_extra_data_not_validated():
+    assert lazy_unpack(pack([1]) + pack(2))[0] == 1
+
+
+def test_lazy_skips_ext():
+    ret = lazy_unpack(pack([ExtType(1, b"t" * 300), ExtType(2, b"abcd"), "end"]))
+
+    assert ret[2] == "end"
+    assert ret[1] == ExtType(2, b"abcd")
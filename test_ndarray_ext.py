@@ -0,0 +1,56 @@
+import pytest
+
+from ndarray_ext import ndarray_ext_hook, register_ndarray
+from pack import ExtType, Packer
+from unpack import unpack
+
+numpy = pytest.importorskip("numpy")
+
+
+def _packer():
+    packer = Packer()
+    register_ndarray(packer)
+    return packer
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        numpy.arange(12, dtype="float64").reshape(3, 4),
+        numpy.arange(100, dtype=">i4"),
+        numpy.arange(6, dtype="uint8").reshape(2, 3)[:, ::2],
+        numpy.array(3.5),
+        numpy.zeros((0, 4), dtype="int16"),
+        numpy.array(["2024-01-01"], dtype="datetime64[s]"),
+    ],
+)
+def test_ndarray_round_trip(test_input):
+    packed = _packer().pack({"array": test_input})
+
+    ret = unpack(packed, ext_hook=ndarray_ext_hook)["array"]
+
+    assert ret.dtype == test_input.dtype
+    assert ret.shape == test_input.shape
+    assert (ret == test_input).all()
+
+
+def test_ndarray_zero_copy():
+    source = bytearray(_packer().pack(numpy.arange(1000, dtype="float64")))
+
+    ret = unpack(source, zero_copy=True, ext_hook=ndarray_ext_hook)
+
+    assert numpy.shares_memory(ret, numpy.frombuffer(source, dtype="uint8"))
+    assert ret[999] == 999
+
+
+def test_ndarray_other_ext_codes():
+    packed = _packer().pack([ExtType(7, b"t")])
+
+    ret = unpack(packed, ext_hook=ndarray_ext_hook)
+
+    assert ret == [ExtType(7, b"t")]
+
+
+def test_ndarray_object_dtype_fail():
+    with pytest.raises(TypeError):
+        _packer().pack(numpy.array([{}], dtype=object))
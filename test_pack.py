@@ -1,7 +1,29 @@
+import collections
+import gc
+import mmap
+import socket
+import threading
+import weakref
+from array import array
+from io import BytesIO
+
 import pytest
 
 import msgpack
-from pack import pack
+from pack import (
+    ExtType,
+    Packer,
+    PackerPool,
+    PackStats,
+    Raw,
+    StrCache,
+    pack,
+    pack_many,
+    pack_spooled,
+    pack_stream,
+    packed_size,
+)
+from unpack import unpack
 
 
 def test_pack_none():
@@ -485,3 +507,825 @@ def test_general_json_data():
     ret = pack(data)
 
     assert ret == expected
+
+
+class _IntSubclass(int):
+    pass
+
+
+class _DictSubclass(dict):
+    pass
+
+
+@pytest.mark.parametrize(
+    "test_input,expected",
+    [
+        (_IntSubclass(300), msgpack.packb(300)),
+        (_DictSubclass(a=1), msgpack.packb({"a": 1})),
+        ((1, "t"), msgpack.packb([1, "t"])),
+    ],
+)
+def test_subclass_fallback(test_input, expected):
+    ret = pack(test_input)
+
+    assert ret == expected
+
+
+def test_unknown_type_fail():
+    with pytest.raises(TypeError):
+        pack(object())
+
+
+def test_register_type():
+    class Point:
+        def __init__(self, x, y):
+            self.x = x
+            self.y = y
+
+    packer = Packer()
+    packer.register(Point, lambda p, obj: p._pack([obj.x, obj.y]))
+
+    ret = packer.pack({"p": Point(1, 2)})
+
+    assert ret == msgpack.packb({"p": [1, 2]})
+
+
+def test_register_type_overrides_cached_fallback():
+    packer = Packer()
+    assert packer.pack(_IntSubclass(1)) == b"\x01"
+
+    packer.register(_IntSubclass, lambda p, obj: p._pack(str(obj)))
+    ret = packer.pack(_IntSubclass(1))
+
+    assert ret == msgpack.packb("1")
+
+
+def test_pack_into_own_buffer():
+    packer = Packer()
+
+    size = packer.pack_into({"a": [1, 2, 3]})
+
+    assert size == len(msgpack.packb({"a": [1, 2, 3]}))
+    assert packer.getbuffer() == msgpack.packb({"a": [1, 2, 3]})
+
+
+def test_pack_into_reuses_buffer():
+    packer = Packer()
+    packer.pack_into("t" * 100)
+    buffer = packer._out
+
+    size = packer.pack_into(1)
+
+    assert size == 1
+    assert packer._out is buffer
+    assert len(buffer) >= 100
+    assert packer.getbuffer() == b"\x01"
+
+
+def test_pack_into_caller_buffer():
+    packer = Packer()
+    buffer = bytearray(b"\xff" * 4)
+
+    size = packer.pack_into([1, "t"], buffer, offset=2)
+
+    assert size == 4
+    assert buffer == b"\xff\xff\x92\x01\xa1t"
+    assert packer.getbuffer() == b"\x92\x01\xa1t"
+    assert packer.pack([1]) == b"\x91\x01"
+
+
+def test_pack_into_caller_buffer_not_kept():
+    packer = Packer()
+    buffer = bytearray(b"-DATA-XXXX")
+    packer.pack_into(1, buffer)
+
+    size = packer.pack_into("hello")
+
+    assert buffer == b"\x01DATA-XXXX"
+    assert size == 6
+    assert packer.getbuffer() == b"\xa5hello"
+
+
+def test_pack_into_offset_past_end():
+    packer = Packer()
+    buffer = bytearray(2)
+
+    size = packer.pack_into("hi", buffer, offset=4)
+
+    assert size == 3
+    assert buffer == b"\x00\x00\x00\x00\xa2hi"
+    assert packer.getbuffer() == b"\xa2hi"
+
+
+def test_pack_into_negative_offset_fail():
+    with pytest.raises(ValueError):
+        Packer().pack_into(1, bytearray(4), offset=-1)
+
+
+@pytest.mark.parametrize("n", [0, 15, 16, 65535, 65536])
+def test_pack_array_header(n):
+    ret = Packer().pack_array_header(n)
+
+    assert ret == msgpack.packb([0] * n)[: len(ret)]
+
+
+class _RecordingFile:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+
+
+def test_pack_stream():
+    fp = _RecordingFile()
+
+    size = pack_stream((i for i in range(1000)), fp, chunk_size=100)
+
+    assert size == sum(len(msgpack.packb(i)) for i in range(1000))
+    assert len(fp.chunks) > 1
+    assert max(len(chunk) for chunk in fp.chunks) <= 100 + 3
+    assert list(msgpack.Unpacker(BytesIO(b"".join(fp.chunks)))) == list(range(1000))
+
+
+def test_pack_stream_array():
+    fp = BytesIO()
+    rows = [{"id": i, "name": "t" * i} for i in range(100)]
+
+    pack_stream(iter(rows), fp, count=len(rows), chunk_size=64)
+
+    assert fp.getvalue() == msgpack.packb(rows)
+
+
+def test_pack_stream_socket():
+    left, right = socket.socketpair()
+    with left, right:
+        size = pack_stream(["t" * 10, 1], left)
+
+        assert right.recv(size) == msgpack.packb("t" * 10) + msgpack.packb(1)
+
+
+@pytest.mark.parametrize("items", [[1, 2], [1, 2, 3, 4]])
+def test_pack_stream_count_mismatch_fail(items):
+    with pytest.raises(ValueError):
+        pack_stream(iter(items), BytesIO(), count=3)
+
+
+def test_pack_many():
+    objs = [1, "t" * 40, {"a": [1, 2]}, None, b"t" * 300]
+
+    packed, offsets = pack_many(objs)
+
+    assert offsets.typecode == "Q"
+    assert len(offsets) == len(objs) + 1
+    assert packed == b"".join(msgpack.packb(obj) for obj in objs)
+    for i, obj in enumerate(objs):
+        assert packed[offsets[i] : offsets[i + 1]] == msgpack.packb(obj)
+
+
+def test_pack_many_empty():
+    packed, offsets = pack_many([])
+
+    assert packed == b""
+    assert list(offsets) == [0]
+
+
+def test_str_cache():
+    cache = StrCache()
+    packer = Packer(str_cache=cache)
+    data = [{"status": "ok", "name": "t" * 40}, {"status": "ok", "name": "x" * 300}]
+
+    ret = packer.pack(data)
+
+    assert ret == msgpack.packb(data)
+    assert cache.misses == 4
+    assert cache.hits == 3
+    assert len(cache) == 4
+
+
+def test_str_cache_eviction():
+    cache = StrCache(maxsize=2)
+    packer = Packer(str_cache=cache)
+
+    packer.pack(["a", "b", "a", "c", "b"])
+
+    assert cache.hits == 1
+    assert cache.misses == 4
+    assert list(cache._entries) == ["c", "b"]
+
+
+def test_str_cache_shared():
+    cache = StrCache()
+
+    Packer(str_cache=cache).pack("status")
+    ret = Packer(str_cache=cache).pack("status")
+
+    assert ret == msgpack.packb("status")
+    assert cache.hits == 1
+
+
+def test_stats():
+    stats = PackStats()
+    packer = Packer(stats=stats)
+    data = {"a": [1, 300, "t" * 40], "b": None}
+
+    ret = packer.pack(data)
+
+    assert ret == msgpack.packb(data)
+    assert stats.counts["fix_map"] == 1
+    assert stats.counts["fix_array"] == 1
+    assert stats.counts["fix_str"] == 2
+    assert stats.counts["str8"] == 1
+    assert stats.counts["uint16"] == 1
+    assert stats.bytes["fix_map"] == 1
+    assert stats.bytes["str8"] == 42
+    assert stats.bytes["uint16"] == 3
+    assert stats.bytes["map"] == 0
+    assert sum(stats.bytes.values()) == len(ret)
+    assert stats.seconds == {}
+
+
+def test_stats_timing_and_hook():
+    exported = []
+    stats = PackStats(timing=True, hook=lambda s: exported.append(s.snapshot()))
+    packer = Packer(stats=stats)
+
+    packer.pack([1.5, 2.5])
+    packer.pack_into("t")
+
+    assert len(exported) == 2
+    assert exported[0]["double_float"]["count"] == 2
+    assert exported[0]["double_float"]["bytes"] == 18
+    assert exported[1]["fix_str"] == stats.snapshot()["fix_str"]
+    assert stats.seconds["fix_array"] >= stats.seconds["double_float"] > 0
+
+
+def test_stats_hook_per_value():
+    calls = []
+    stats = PackStats(hook=calls.append)
+    packer = Packer(stats=stats)
+    packer.register(_IntSubclass, lambda p, obj: p._pack([int(obj), str(obj)]))
+
+    packer.pack_many([_IntSubclass(1), [2, 3], "t"])
+
+    assert len(calls) == 3
+    assert stats.counts["registered"] == 1
+    assert stats.bytes["registered"] == 0
+
+
+def test_stats_disabled():
+    packer = Packer()
+
+    assert "_pack_int" not in vars(packer)
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        [i / 7 for i in range(100)],
+        [i - 32 for i in range(160)],
+        list(range(128, 256)),
+        list(range(1000, 66000, 7)),
+        [2**40 + i for i in range(20)],
+        [-i - 33 for i in range(90)],
+        [-i - 129 for i in range(900)],
+        [-(2**20) - i for i in range(20)],
+        [-(2**40) - i for i in range(20)],
+        [1, 2**20] * 10,
+        [1.5] * 10 + [1] * 10,
+        tuple(range(20)),
+    ],
+)
+def test_homogeneous_list(test_input):
+    ret = pack(test_input)
+
+    assert ret == msgpack.packb(test_input)
+
+
+def test_homogeneous_list_single_float():
+    test_input = [i / 7 for i in range(100)]
+
+    ret = pack(test_input, using_single_float=True)
+
+    assert ret == msgpack.packb(test_input, use_single_float=True)
+
+
+def test_homogeneous_list_registered_int():
+    packer = Packer()
+    packer.register(int, lambda p, obj: p._pack(str(obj)))
+
+    ret = packer.pack(list(range(20)))
+
+    assert ret == msgpack.packb([str(i) for i in range(20)])
+
+
+def test_homogeneous_list_int_out_of_range_fail():
+    with pytest.raises(ValueError):
+        pack([2**64] * 20)
+
+
+@pytest.mark.parametrize(
+    "test_input,expected",
+    [
+        (array("d", [i / 7 for i in range(100)]), [i / 7 for i in range(100)]),
+        (array("d"), []),
+        (array("b", range(-100, 100)), list(range(-100, 100))),
+        (array("H", range(0, 65536, 100)), list(range(0, 65536, 100))),
+        (array("q", [-(2**40), 2**40]), [-(2**40), 2**40]),
+        (array("u", "test"), list("test")),
+    ],
+)
+def test_typed_array(test_input, expected):
+    ret = pack(test_input)
+
+    assert ret == msgpack.packb(expected)
+
+
+def test_typed_array_single_float():
+    test_input = array("f", [0.5, 1.25, -3.0])
+
+    ret = pack(test_input)
+
+    assert ret == msgpack.packb(test_input.tolist(), use_single_float=True)
+
+
+@pytest.mark.parametrize(
+    "dtype,values",
+    [
+        ("float64", [i / 7 for i in range(100)]),
+        ("int64", list(range(-100, 100))),
+        ("uint16", list(range(0, 65536, 100))),
+        ("int32", [1, 2**20]),
+        ("bool", [True, False]),
+        ("int64", []),
+    ],
+)
+def test_ndarray(dtype, values):
+    numpy = pytest.importorskip("numpy")
+
+    ret = pack(numpy.array(values, dtype=dtype))
+
+    assert ret == msgpack.packb(values)
+
+
+def test_ndarray_2d():
+    numpy = pytest.importorskip("numpy")
+    test_input = numpy.arange(6, dtype="float32").reshape(2, 3)
+
+    ret = pack(test_input)
+
+    assert ret == msgpack.packb(test_input.tolist())
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 8, 16, 17, 255, 256, 65536])
+def test_ext_type(size):
+    test_input = ExtType(5, b"t" * size)
+
+    ret = pack(test_input)
+
+    assert ret == msgpack.packb(msgpack.ExtType(5, b"t" * size))
+
+
+def test_ext_type_code_fail():
+    with pytest.raises(ValueError):
+        pack(ExtType(128, b"t"))
+
+
+def _nested(depth):
+    obj = [1, "leaf"]
+    for i in range(depth):
+        obj = [i, {"child": obj}]
+    return obj
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        None,
+        [],
+        {},
+        [1, [2, [3, []]], {}],
+        {"a": {"x": [1, 2.5, "t" * 40]}, "b": (b"t" * 300, None, True)},
+        [[i / 7 for i in range(20)], list(range(20)), [1, 2**20] * 10],
+        {i: [i] * i for i in range(40)},
+        _nested(100),
+    ],
+)
+def test_iterative(test_input):
+    ret = Packer(iterative=True).pack(test_input)
+
+    assert ret == Packer().pack(test_input)
+
+
+def test_iterative_deep_nesting():
+    test_input = _nested(5000)
+
+    ret = Packer(iterative=True).pack(test_input)
+
+    obj = unpack(ret)
+    for i in reversed(range(5000)):
+        assert obj[0] == i
+        obj = obj[1]["child"]
+    assert obj == [1, "leaf"]
+
+
+def test_iterative_max_depth():
+    packer = Packer(iterative=True, max_depth=3)
+
+    assert packer.pack([[[1]]]) == msgpack.packb([[[1]]])
+    with pytest.raises(ValueError):
+        packer.pack([[[[1]]]])
+
+
+class _List(list):
+    pass
+
+
+class _Dict(dict):
+    pass
+
+
+def test_iterative_subclasses():
+    test_input = _List([_Dict(a=_List([1, 2])), (3,)])
+
+    ret = Packer(iterative=True).pack(test_input)
+
+    assert ret == msgpack.packb([{"a": [1, 2]}, [3]])
+
+
+def test_iterative_subclass_deep_nesting():
+    test_input = _List()
+    for _ in range(5000):
+        test_input = _List([_Dict(child=test_input)])
+
+    ret = Packer(iterative=True).pack(test_input)
+
+    assert len(ret) == 5000 * 8 + 1
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"stats": PackStats()}], ids=["inline", "stats"]
+)
+@pytest.mark.parametrize("container", [list, _List])
+def test_iterative_max_depth_carried(options, container):
+    packer = Packer(iterative=True, max_depth=3, **options)
+    nested = container([container([container([1])])])
+
+    assert packer.pack(nested) == msgpack.packb([[[1]]])
+    with pytest.raises(ValueError):
+        packer.pack(container([nested]))
+    assert packer.pack(nested) == msgpack.packb([[[1]]])
+
+
+def test_iterative_max_depth_registered():
+    packer = Packer(iterative=True, max_depth=3)
+    packer.register(tuple, lambda p, obj: p._pack(list(obj)))
+
+    assert packer.pack([(1,)]) == msgpack.packb([[1]])
+    with pytest.raises(ValueError):
+        packer.pack([([[1]],)])
+
+
+def test_max_depth_requires_iterative():
+    with pytest.raises(ValueError):
+        Packer(max_depth=10)
+
+
+def test_iterative_registered_container():
+    packer = Packer(iterative=True)
+    packer.register(tuple, lambda p, obj: p._pack({"tuple": list(obj)}))
+
+    ret = packer.pack([(1, (2,))])
+
+    assert ret == msgpack.packb([{"tuple": [1, {"tuple": [2]}]}])
+
+
+def test_iterative_stats():
+    stats = PackStats()
+
+    ret = Packer(iterative=True, stats=stats).pack({"a": [1, 2]})
+
+    assert ret == msgpack.packb({"a": [1, 2]})
+    assert stats.counts["fix_array"] == 1
+    assert sum(stats.bytes.values()) == len(ret)
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        None,
+        True,
+        [0, 0x7F, 0x80, 0xFF, 0x100, 0xFFFF, 0x10000, 0xFFFFFFFF, 0x100000000],
+        [-1, -0x20, -0x21, -0x80, -0x81, -0x8000, -0x8001, -0x80000001],
+        [1.5, "", "a" * 31, "a" * 32, "a" * 256, "\u00e9" * 16, "\u00e9" * 70000],
+        [b"", b"a" * 256, bytearray(b"a" * 70000)],
+        {"list": list(range(16)), "floats": [i / 3 for i in range(20)]},
+        [list(range(-100, 100)), [1] * 15 + ["a"], (2**40,) * 20],
+        {i: [i] for i in range(70000)},
+        [ExtType(1, b"a"), ExtType(2, b"abc"), ExtType(3, b"a" * 300)],
+        [array("d", [1.0, 2.0]), array("b", range(20)), _IntSubclass(3)],
+        _nested(2000),
+    ],
+)
+def test_packed_size(test_input):
+    ret = packed_size(test_input)
+
+    assert ret == len(Packer(iterative=True).pack(test_input))
+
+
+def test_packed_size_single_float():
+    test_input = [0.5, [i / 3 for i in range(20)]]
+
+    ret = packed_size(test_input, using_single_float=True)
+
+    assert ret == len(pack(test_input, using_single_float=True))
+
+
+def test_packed_size_registered():
+    packer = Packer()
+    packer.register(int, lambda p, obj: p._pack(str(obj)))
+    test_input = {"a": [1, 22, 333] * 10, "b": 4}
+
+    ret = packer.packed_size(test_input)
+
+    assert ret == len(packer.pack(test_input))
+
+
+def test_packed_size_int_out_of_range_fail():
+    with pytest.raises(ValueError):
+        packed_size([2**64])
+
+
+def test_pack_exact():
+    test_input = {"id": 7, "values": list(range(1000)), "name": "record"}
+
+    ret = Packer().pack_exact(test_input)
+
+    assert ret == pack(test_input)
+
+
+def test_packer_pool_threads():
+    pool = PackerPool()
+    inputs = [{"thread": i, "values": list(range(i * 10))} for i in range(8)]
+    results = {}
+
+    def worker(i):
+        results[i] = [pool.pack(inputs[i]) for _ in range(200)]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, packed in results.items():
+        assert packed == [msgpack.packb(inputs[i])] * 200
+
+
+def test_packer_pool_reuses_packer():
+    pool = PackerPool()
+
+    with pool.packer() as first:
+        pass
+    with pool.packer() as second:
+        pass
+
+    assert first is second
+
+
+def test_packer_pool_nested():
+    def factory():
+        packer = Packer()
+        packer.register(_IntSubclass, lambda p, obj: p._pack(pool.pack([int(obj)])))
+        return packer
+
+    pool = PackerPool(factory)
+
+    ret = pool.pack({"p": _IntSubclass(1)})
+
+    assert ret == msgpack.packb({"p": msgpack.packb([1])})
+
+
+def test_packer_pool_lookups_bounded():
+    pool = PackerPool()
+    refs = []
+    for i in range(1000):
+        typ = collections.namedtuple("Point%d" % i, "x y")
+        refs.append(weakref.ref(typ))
+        assert pool.pack(typ(i, 1)) == msgpack.packb([i, 1])
+        del typ
+    gc.collect()
+
+    with pool.packer() as packer:
+        assert len(packer._dispatch) <= len(packer._builtin_types) + 257
+    assert sum(ref() is not None for ref in refs) <= 257
+
+
+def test_packer_pool_pack_into():
+    pool = PackerPool(using_single_float=True)
+
+    with pool.packer() as packer:
+        packer.pack_into([0.5, 1])
+        with packer.getbuffer() as view:
+            ret = bytes(view)
+
+    assert ret == msgpack.packb([0.5, 1], use_single_float=True)
+
+
+def test_raw():
+    profile = {"name": "user", "tags": ["a", "b"], "id": 300}
+    fragment = Raw(pack(profile))
+
+    ret = pack([{"user": fragment}, fragment])
+
+    assert ret == msgpack.packb([{"user": profile}, profile])
+    assert packed_size([{"user": fragment}, fragment]) == len(ret)
+
+
+def test_raw_iterative_and_stats():
+    stats = PackStats()
+    fragment = Raw(b"\x92\x01\x02")
+
+    ret = Packer(iterative=True).pack([fragment])
+    Packer(stats=stats).pack([fragment])
+
+    assert ret == b"\x91\x92\x01\x02"
+    assert stats.counts["raw"] == 1
+    assert stats.bytes["raw"] == 3
+
+
+def test_raw_checked():
+    data = bytearray(pack({"a": [1, 2]}))
+
+    assert Raw.checked(data) == Raw(data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x92\x01",
+        b"\x01\x02",
+        b"\xc1",
+        b"\xdc\x00",
+        b"\xdd\x00\x00",
+        b"\xde\x00",
+        b"\xdf\x00\x00\x00",
+    ],
+)
+def test_raw_checked_fail(data):
+    with pytest.raises(ValueError):
+        Raw.checked(data)
+
+
+def test_pack_memoryview():
+    data = array("H", range(300))
+
+    ret = pack([memoryview(data), memoryview(b"abcdef")[::2]])
+
+    assert ret == msgpack.packb([data.tobytes(), b"ace"])
+    assert packed_size([memoryview(data)]) == len(pack([data.tobytes()]))
+
+
+def test_pack_segments():
+    blob = b"x" * 10000
+    view = memoryview(bytearray(b"y" * 5000))
+    test_input = {"id": 1, "blob": blob, "view": view, "small": b"z" * 10}
+
+    ret = Packer().pack_segments(test_input, threshold=4096)
+
+    assert b"".join(ret) == pack(test_input)
+    assert len(ret) == 5
+    assert ret[1] is blob
+    assert ret[3].obj is view.obj
+
+
+def test_pack_segments_small():
+    ret = Packer().pack_segments([1, "a", b"b"])
+
+    assert ret == [bytearray(pack([1, "a", b"b"]))]
+
+
+def test_pack_segments_sendmsg():
+    test_input = [b"a" * 20000, "text", b"b" * 20000]
+    left, right = socket.socketpair()
+    segments = Packer().pack_segments(test_input)
+
+    with left, right:
+        sent = left.sendmsg(segments)
+        left.close()
+        received = b""
+        while True:
+            chunk = right.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+
+    assert sent == len(received) == len(pack(test_input))
+    assert received == pack(test_input)
+
+
+@pytest.mark.parametrize(
+    "test_input,expected",
+    [
+        (0.5, b"\xca\x3f\x00\x00\x00"),
+        (-0.0, b"\xca\x80\x00\x00\x00"),
+        (float("inf"), b"\xca\x7f\x80\x00\x00"),
+        (0.1, msgpack.packb(0.1)),
+        (1e300, msgpack.packb(1e300)),
+        (float("nan"), msgpack.packb(float("nan"))),
+    ],
+)
+def test_auto_single_float(test_input, expected):
+    ret = Packer(auto_single_float=True).pack(test_input)
+
+    assert ret == expected
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        [i / 4 for i in range(20)],
+        [i / 3 for i in range(20)],
+        [i / 4 for i in range(10)] + [i / 3 for i in range(10)],
+        (0.5,) * 20,
+        array("d", [i / 4 for i in range(20)]),
+        array("d", [0.1] * 20),
+        array("d", [0.1, 0.5] * 10),
+    ],
+)
+def test_auto_single_float_list(test_input):
+    packer = Packer(auto_single_float=True)
+    expected = packer.pack_array_header(len(test_input)) + b"".join(
+        packer.pack(item) for item in test_input
+    )
+
+    ret = packer.pack(test_input)
+
+    assert ret == expected
+    assert unpack(ret) == list(test_input)
+    assert packer.packed_size(list(test_input)) == len(ret)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [[i / 4 for i in range(20)], [0.1] * 20, [0.1, 0.5] * 10, [1e300, 0.5] * 10],
+)
+def test_auto_single_float_ndarray(values):
+    numpy = pytest.importorskip("numpy")
+    packer = Packer(auto_single_float=True)
+
+    ret = packer.pack(numpy.array(values, dtype="float64"))
+
+    assert ret == packer.pack(array("d", values)) == packer.pack(values)
+
+
+def test_auto_single_float_stats():
+    stats = PackStats()
+    packer = Packer(auto_single_float=True, stats=stats)
+
+    ret = packer.pack([0.5, 0.1, [0.25] * 20])
+
+    assert stats.saved_bytes == 4 * 21
+    assert len(ret) == len(msgpack.packb([0.5, 0.1, [0.25] * 20])) - 4 * 21
+    stats.reset()
+    assert stats.saved_bytes == 0
+
+
+def test_auto_single_float_overridden():
+    ret = Packer(using_single_float=True, auto_single_float=True).pack(0.1)
+
+    assert ret == msgpack.packb(0.1, use_single_float=True)
+
+
+def test_pack_spooled_in_memory():
+    test_input = {"rows": list(range(100))}
+
+    with pack_spooled(test_input, max_memory=1024) as ret:
+        assert isinstance(ret, BytesIO)
+        assert ret.read() == pack(test_input)
+
+
+def test_pack_spooled_spills(tmp_path):
+    test_input = [{"id": i, "blob": b"x" * 100} for i in range(100)]
+    expected = pack(test_input)
+
+    with Packer(iterative=True).pack_spooled(
+        test_input, max_memory=1000, dir=tmp_path
+    ) as ret:
+        assert not isinstance(ret, BytesIO)
+        with mmap.mmap(ret.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            assert mapped[:] == expected
+        assert ret.read() == expected
+
+
+def test_pack_spooled_large_write():
+    # A write that would cross the limit goes straight to the file.
+    with pack_spooled([b"a" * 10, b"b" * 5000], max_memory=1000) as ret:
+        assert not isinstance(ret, BytesIO)
+        assert ret.read() == pack([b"a" * 10, b"b" * 5000])
+
+
+def test_pack_spooled_fail():
+    with pytest.raises(TypeError):
+        pack_spooled([b"x" * 5000, object()], max_memory=1000)
@@ -0,0 +1,48 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from pack import pack, pack_many
+from parallel import pack_many_parallel, pack_parallel
+
+RECORDS = [{"id": i, "name": "t" * (i % 40), "score": i / 7} for i in range(1000)]
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        [],
+        [1],
+        RECORDS,
+        tuple(range(70000)),
+    ],
+)
+def test_pack_parallel(test_input):
+    ret = pack_parallel(test_input, workers=2, chunk_size=300)
+
+    assert ret == pack(test_input)
+
+
+def test_pack_parallel_single_float():
+    test_input = [i / 3 for i in range(100)]
+
+    ret = pack_parallel(test_input, workers=2, chunk_size=30, using_single_float=True)
+
+    assert ret == pack(test_input, using_single_float=True)
+
+
+def test_pack_parallel_executor():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        first = pack_parallel(RECORDS, chunk_size=100, executor=executor)
+        second = pack_parallel(RECORDS[:500], chunk_size=100, executor=executor)
+
+    assert first == pack(RECORDS)
+    assert second == pack(RECORDS[:500])
+
+
+def test_pack_many_parallel():
+    packed, offsets = pack_many_parallel(RECORDS, workers=2, chunk_size=300)
+
+    expected_packed, expected_offsets = pack_many(RECORDS)
+    assert packed == expected_packed
+    assert offsets == expected_offsets
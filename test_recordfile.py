@@ -0,0 +1,104 @@
+import multiprocessing
+
+import pytest
+
+from recordfile import RecordReader, RecordWriter
+
+RECORDS = [{"id": i, "name": "t" * (i % 40), "blob": b"x" * i} for i in range(200)]
+
+
+def test_append_and_read(tmp_path):
+    path = tmp_path / "log.msgpack"
+
+    with RecordWriter(path) as writer:
+        numbers = [writer.append(record) for record in RECORDS]
+
+    assert numbers == list(range(len(RECORDS)))
+    with RecordReader(path) as reader:
+        assert len(reader) == len(RECORDS)
+        assert reader[0] == RECORDS[0]
+        assert reader[150] == RECORDS[150]
+        assert reader[-1] == RECORDS[-1]
+        assert reader[10:20] == RECORDS[10:20]
+        with pytest.raises(IndexError):
+            reader[len(RECORDS)]
+
+
+def test_extend_and_reopen(tmp_path):
+    path = tmp_path / "log.msgpack"
+    with RecordWriter(path) as writer:
+        writer.extend(RECORDS[:100])
+
+    with RecordWriter(path) as writer:
+        assert len(writer) == 100
+        writer.extend(RECORDS[100:])
+
+    with RecordReader(path) as reader:
+        assert reader[:] == RECORDS
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "log.msgpack"
+    RecordWriter(path).close()
+
+    with RecordReader(path) as reader:
+        assert len(reader) == 0
+        assert reader[:] == []
+
+
+def test_refresh(tmp_path):
+    path = tmp_path / "log.msgpack"
+    with RecordWriter(path) as writer, RecordReader(path) as reader:
+        writer.append(1)
+        assert len(reader) == 0
+
+        reader.refresh()
+        assert reader[0] == 1
+
+        writer.append(2)
+        reader.refresh()
+        assert reader[:] == [1, 2]
+
+
+def test_interrupted_append_truncated(tmp_path):
+    path = tmp_path / "log.msgpack"
+    with RecordWriter(path) as writer:
+        writer.extend([1, 2])
+    with open(path, "ab") as fp:
+        fp.write(b"\x92\x01")
+    with open(str(path) + ".idx", "ab") as fp:
+        fp.write(b"\x00\x00")
+
+    with RecordWriter(path) as writer:
+        writer.append("t")
+
+    with RecordReader(path) as reader:
+        assert reader[:] == [1, 2, "t"]
+
+
+def test_zero_copy_raw(tmp_path):
+    path = tmp_path / "log.msgpack"
+    with RecordWriter(path) as writer:
+        writer.append(b"t" * 300)
+
+    with RecordReader(path, zero_copy=True) as reader:
+        with reader.raw(0) as raw, reader[0] as blob:
+            assert raw[:3] == b"\xc5\x01\x2c"
+            assert blob == b"t" * 300
+
+
+def _read_record(args):
+    path, n = args
+    with RecordReader(path) as reader:
+        return reader[n]
+
+
+def test_read_from_processes(tmp_path):
+    path = str(tmp_path / "log.msgpack")
+    with RecordWriter(path) as writer:
+        writer.extend(RECORDS)
+
+    with multiprocessing.Pool(2) as pool:
+        ret = pool.map(_read_record, [(path, n) for n in range(0, 200, 7)])
+
+    assert ret == RECORDS[::7]
@@ -0,0 +1,144 @@
+import dataclasses
+from typing import NamedTuple, TypedDict
+
+import pytest
+
+import msgpack
+from pack import Packer, PackStats
+from schema import compile_encoder
+
+
+@dataclasses.dataclass
+class User:
+    name: str
+    age: int
+    tags: list
+
+
+class Point(NamedTuple):
+    x: int
+    y: float
+
+
+class Address(TypedDict):
+    street: str
+    zip: str
+
+
+class PartialAddress(TypedDict, total=False):
+    street: str
+
+
+class Slotted:
+    __slots__ = ("a", "b")
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+
+class SlottedChild(Slotted):
+    __slots__ = "c"
+
+    def __init__(self, a, b, c):
+        super().__init__(a, b)
+        self.c = c
+
+
+class PrivateSlotted(Slotted):
+    __slots__ = ("__secret",)
+
+    def __init__(self, a, b, secret):
+        super().__init__(a, b)
+        self.__secret = secret
+
+
+class PrivateSlottedChild(PrivateSlotted):
+    __slots__ = ("__secret",)
+
+
+@dataclasses.dataclass
+class Empty:
+    pass
+
+
+@pytest.mark.parametrize(
+    "cls,test_input,expected",
+    [
+        (
+            User,
+            User("Jane", 25, ["a", "b"]),
+            msgpack.packb({"name": "Jane", "age": 25, "tags": ["a", "b"]}),
+        ),
+        (Point, Point(1, 2.5), msgpack.packb({"x": 1, "y": 2.5})),
+        (Slotted, Slotted(1, "t"), msgpack.packb({"a": 1, "b": "t"})),
+        (SlottedChild, SlottedChild(1, 2, 3), msgpack.packb({"a": 1, "b": 2, "c": 3})),
+        (
+            PrivateSlotted,
+            PrivateSlotted(1, 2, 3),
+            msgpack.packb({"a": 1, "b": 2, "__secret": 3}),
+        ),
+        (Empty, Empty(), msgpack.packb({})),
+    ],
+)
+def test_registered_schema(cls, test_input, expected):
+    packer = Packer()
+    packer.register(cls, compile_encoder(cls))
+
+    ret = packer.pack(test_input)
+
+    assert ret == expected
+
+
+def test_nested_schema():
+    packer = Packer()
+    packer.register(User, compile_encoder(User))
+    packer.register(Point, compile_encoder(Point))
+
+    ret = packer.pack([User("Jane", 25, [Point(1, 2.0)])])
+
+    assert ret == msgpack.packb(
+        [{"name": "Jane", "age": 25, "tags": [{"x": 1, "y": 2.0}]}]
+    )
+
+
+@pytest.mark.parametrize("method", ["pack", "pack_exact"])
+def test_schema_stats(method):
+    calls = []
+    stats = PackStats(hook=calls.append)
+    packer = Packer(stats=stats)
+    packer.register(User, compile_encoder(User))
+
+    ret = getattr(packer, method)(User("Jane", 25, []))
+
+    assert sum(stats.bytes.values()) == len(ret)
+    assert stats.counts["registered"] == 1
+    assert (
+        stats.bytes["registered"]
+        == len(msgpack.packb({"name": 0, "age": 0, "tags": 0})) - 3
+    )
+    assert stats.counts["fix_str"] == 1
+    assert len(calls) == 1
+
+
+def test_typed_dict_schema():
+    address = Address(street="456 Oak Ave", zip="67890")
+
+    ret = Packer().pack_with(compile_encoder(Address), address)
+
+    assert ret == msgpack.packb(address)
+
+
+def test_typed_dict_optional_keys_fail():
+    with pytest.raises(TypeError):
+        compile_encoder(PartialAddress)
+
+
+def test_unsupported_class_fail():
+    with pytest.raises(TypeError):
+        compile_encoder(object)
+
+
+def test_duplicate_slot_names_fail():
+    with pytest.raises(TypeError):
+        compile_encoder(PrivateSlottedChild)
@@ -0,0 +1,191 @@
+import pytest
+
+import msgpack
+from pack import ExtType, Packer, pack
+from session import SessionPacker, SessionUnpacker
+from unpack import unpack
+
+MESSAGES = [
+    {"timestamp": i, "message": "event %d" % i, "nested": {"severity": i % 5}}
+    for i in range(50)
+]
+
+
+def test_session_stream():
+    packer = SessionPacker()
+    unpacker = SessionUnpacker()
+    packed = [packer.pack(message) for message in MESSAGES]
+
+    for data in packed:
+        unpacker.feed(data)
+    ret = list(unpacker)
+
+    assert ret == MESSAGES
+    assert len(packer) == 4
+    assert sum(map(len, packed)) < len(pack(MESSAGES)) * 0.8
+    # Later messages refer to every key by id.
+    assert len(packed[1]) == len(pack(MESSAGES[1])) - sum(
+        len(key) - 2 for key in ("timestamp", "message", "nested", "severity")
+    )
+
+
+def test_session_byte_at_a_time():
+    packer = SessionPacker()
+    unpacker = SessionUnpacker()
+    data = b"".join(packer.pack(message) for message in MESSAGES[:5])
+
+    ret = []
+    for i in range(len(data)):
+        unpacker.feed(data[i : i + 1])
+        ret.extend(unpacker)
+
+    assert ret == MESSAGES[:5]
+
+
+def test_session_unpack():
+    packer = SessionPacker()
+    unpacker = SessionUnpacker()
+
+    ret = [unpacker.unpack(packer.pack(message)) for message in MESSAGES]
+
+    assert ret == MESSAGES
+
+
+def test_session_eviction():
+    packer = SessionPacker(maxsize=3)
+    unpacker = SessionUnpacker()
+    messages = [{"key%d" % (i % 7): i, "key0": -i} for i in range(30)]
+
+    ret = [unpacker.unpack(packer.pack(message)) for message in messages]
+
+    assert ret == messages
+    assert len(packer) == 3
+    assert len(unpacker._symbols) == 3
+
+
+def test_session_wide_ids():
+    packer = SessionPacker(maxsize=1000)
+    unpacker = SessionUnpacker()
+    message = {"key%d" % i: i for i in range(600)}
+
+    first = packer.pack(message)
+    second = packer.pack(message)
+
+    assert unpacker.unpack(first) == message
+    assert unpacker.unpack(second) == message
+    # Refs take 3 bytes below id 256 and 4 bytes above.
+    assert len(second) == 3 + 256 * 3 + 344 * 4 + len(pack(list(range(600)))) - 3
+
+
+@pytest.mark.parametrize("key", ["ab", "x" * 65, 7, (1, 2), b"bytes"])
+def test_session_plain_keys(key):
+    packer = SessionPacker()
+
+    ret = packer.pack({key: 1})
+
+    assert ret == pack({key: 1})
+    assert len(packer) == 0
+
+
+def test_session_values_untouched():
+    packer = SessionPacker()
+
+    ret = packer.pack(["value", {"key": "value"}])
+
+    obj = unpack(ret, ext_hook=lambda code, data: (code, bytes(data)))
+    assert obj == ["value", {(2, b"\x00\x00key"): "value"}]
+
+
+def test_session_rollback():
+    packer = SessionPacker(maxsize=2)
+    unpacker = SessionUnpacker()
+    unpacker.unpack(packer.pack({"aaa": 1, "bbb": 2}))
+
+    with pytest.raises(TypeError):
+        packer.pack({"ccc": 1, "ddd": 2, "eee": object()})
+    ret = packer.pack({"aaa": 1, "bbb": 2})
+
+    assert unpacker.unpack(ret) == {"aaa": 1, "bbb": 2}
+    assert len(ret) == 1 + 2 * 4
+
+
+def test_session_packed_size():
+    packer = SessionPacker()
+
+    size = packer.packed_size(MESSAGES[0])
+    ret = packer.pack(MESSAGES[0])
+
+    assert size == len(ret)
+    assert packer.packed_size(MESSAGES[1]) == len(packer.pack(MESSAGES[1]))
+
+
+def test_session_iterative():
+    packer = SessionPacker(iterative=True)
+    unpacker = SessionUnpacker()
+
+    ret = [unpacker.unpack(packer.pack(message)) for message in MESSAGES]
+
+    assert ret == MESSAGES
+    assert len(packer) == 4
+
+
+def test_session_iterative_deep_nesting():
+    packer = SessionPacker(iterative=True, max_depth=6000)
+    unpacker = SessionUnpacker()
+    test_input = {"leaf": 1}
+    for i in range(5000):
+        test_input = {"child": test_input, (i, "key"): i}
+
+    ret = packer.pack(test_input)
+
+    obj = unpacker.unpack(ret)
+    for i in reversed(range(5000)):
+        assert obj[(i, "key")] == i
+        obj = obj["child"]
+    assert obj == {"leaf": 1}
+    assert len(packer) == 2
+
+
+def test_session_iterative_max_depth():
+    packer = SessionPacker(iterative=True, max_depth=3)
+
+    ret = packer.pack({"key": {(1, 2): 3}})
+
+    assert SessionUnpacker().unpack(ret) == {"key": {(1, 2): 3}}
+    with pytest.raises(ValueError):
+        packer.pack({"key": {((1,), 2): 3}})
+
+
+def test_session_reset():
+    packer = SessionPacker()
+    unpacker = SessionUnpacker()
+    unpacker.unpack(packer.pack({"key": 1}))
+
+    packer.reset()
+    unpacker.reset()
+
+    assert unpacker.unpack(packer.pack({"other": 1, "key": 2})) == {
+        "other": 1,
+        "key": 2,
+    }
+
+
+def test_session_undefined_ref_fail():
+    packer = SessionPacker()
+    packer.pack({"key": 1})
+
+    with pytest.raises(ValueError):
+        SessionUnpacker().unpack(packer.pack({"key": 1}))
+
+
+def test_session_ext_hook():
+    unpacker = SessionUnpacker(ext_hook=lambda code, data: (code, bytes(data)))
+    packer = SessionPacker()
+
+    ret = unpacker.unpack(packer.pack({"key": ExtType(9, b"x")}))
+
+    assert ret == {"key": (9, b"x")}
+
+
+def test_packer_map_keys_unchanged():
+    assert Packer().pack({"key": 1}) == msgpack.packb({"key": 1})
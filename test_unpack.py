@@ -0,0 +1,216 @@
+import mmap
+
+import pytest
+
+import msgpack
+from demo import data as demo_data
+from pack import ExtType, pack
+from unpack import Unpacker, unpack
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        None,
+        True,
+        False,
+        0,
+        127,
+        255,
+        65535,
+        4294967295,
+        18446744073709551615,
+        -1,
+        -32,
+        -128,
+        -32768,
+        -2147483648,
+        -9223372036854775808,
+        1.1,
+        "",
+        "t",
+        "t" * 31,
+        "t" * 255,
+        "t" * 65536,
+        b"",
+        b"t" * 255,
+        b"t" * 65536,
+        [],
+        [1] * 15,
+        [1] * 16,
+        {},
+        {i: i for i in range(16)},
+        {"a": {"x": [1, {"y": None}]}, "b": [[], {}]},
+        demo_data,
+    ],
+)
+def test_round_trip(test_input):
+    ret = unpack(pack(test_input))
+
+    assert ret == test_input
+
+
+def test_single_float():
+    ret = unpack(pack(1.5, using_single_float=True))
+
+    assert ret == 1.5
+
+
+def test_unpack_reference_output():
+    data = {"a": [1, -1000, 2.5, "t" * 40, b"t" * 300], "b": {"c": None}}
+
+    ret = unpack(msgpack.packb(data, use_bin_type=True))
+
+    assert ret == data
+
+
+def test_unpack_tuple_key():
+    ret = unpack(msgpack.packb({(1, 2): "t"}))
+
+    assert ret == {(1, 2): "t"}
+
+
+def test_unpack_incomplete_fail():
+    with pytest.raises(ValueError):
+        unpack(pack([1, 2, "test"])[:-1])
+
+
+def test_unpack_extra_data_fail():
+    with pytest.raises(ValueError):
+        unpack(pack(1) + pack(2))
+
+
+def test_unpack_unknown_format_fail():
+    with pytest.raises(ValueError):
+        unpack(b"\xc1")
+
+
+def test_unpacker_empty():
+    unpacker = Unpacker()
+
+    assert list(unpacker) == []
+
+
+def test_unpacker_stream():
+    objects = [1, "t" * 40, demo_data, [], {"a": b"t" * 300}]
+    unpacker = Unpacker()
+
+    unpacker.feed(b"".join(pack(obj) for obj in objects))
+
+    assert list(unpacker) == objects
+
+
+def test_unpacker_feed_byte_by_byte():
+    objects = [demo_data, [1, [2, [3, {"a": [4.5]}]]], "t" * 300, -100000]
+    stream = b"".join(pack(obj) for obj in objects)
+    unpacker = Unpacker()
+    ret = []
+
+    for i in range(len(stream)):
+        unpacker.feed(stream[i : i + 1])
+        ret.extend(unpacker)
+
+    assert ret == objects
+
+
+def test_unpacker_keeps_partial_message():
+    unpacker = Unpacker()
+    first, second = pack([1, 2, 3]), pack({"a": "b"})
+
+    unpacker.feed(first + second[:2])
+    assert list(unpacker) == [[1, 2, 3]]
+    unpacker.feed(second[2:])
+
+    assert list(unpacker) == [{"a": "b"}]
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview])
+def test_unpack_buffer_input(wrap):
+    data = {"a": [1, "t"], "b": b"t" * 300}
+
+    ret = unpack(wrap(pack(data)))
+
+    assert ret == data
+    assert type(ret["b"]) is bytes
+
+
+def test_unpack_zero_copy():
+    source = bytearray(pack({"small": b"t", "large": b"x" * 70000}))
+
+    ret = unpack(source, zero_copy=True)
+
+    assert type(ret["large"]) is memoryview
+    assert ret["large"] == b"x" * 70000
+    assert ret["large"].obj is source
+    assert ret["small"] == b"t"
+
+
+def test_unpack_zero_copy_mmap(tmp_path):
+    path = tmp_path / "blob.msgpack"
+    path.write_bytes(pack([b"t" * 300, "text"]))
+
+    with open(path, "rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        ret = unpack(mm, zero_copy=True)
+
+        assert ret[0].obj is mm
+        assert ret[0] == b"t" * 300
+        assert ret[1] == "text"
+        ret[0].release()
+
+
+def test_unpacker_pending():
+    unpacker = Unpacker()
+    packed = pack([1, "test"])
+
+    unpacker.feed(packed[:3])
+    assert list(unpacker) == []
+    assert unpacker.pending
+    unpacker.feed(packed[3:])
+    assert list(unpacker) == [[1, "test"]]
+
+    assert not unpacker.pending
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 8, 16, 17, 255, 256, 65536])
+def test_unpack_ext_type(size):
+    packed = msgpack.packb([msgpack.ExtType(5, b"t" * size), 1])
+
+    ret = unpack(packed)
+
+    assert ret == [ExtType(5, b"t" * size), 1]
+
+
+def test_unpack_ext_signed_code():
+    ret = unpack(b"\xd4\xff\x00")
+
+    assert ret == ExtType(-1, b"\x00")
+
+
+def test_unpack_ext_hook():
+    packed = pack({"a": ExtType(1, b"\x00\x01"), "b": ExtType(2, b"t")})
+
+    ret = unpack(packed, ext_hook=lambda code, data: (code, bytes(data)))
+
+    assert ret == {"a": (1, b"\x00\x01"), "b": (2, b"t")}
+
+
+def test_unpack_ext_zero_copy():
+    source = bytearray(pack(ExtType(1, b"t" * 300)))
+
+    ret = unpack(source, zero_copy=True)
+
+    assert ret.data.obj is source
+
+
+def test_unpacker_ext_byte_by_byte():
+    stream = pack(ExtType(3, b"t" * 300)) + pack(ExtType(4, b"abcd"))
+    unpacker = Unpacker()
+    ret = []
+
+    for i in range(len(stream)):
+        unpacker.feed(stream[i : i + 1])
+        ret.extend(unpacker)
+
+    assert ret == [ExtType(3, b"t" * 300), ExtType(4, b"abcd")]
@@ -0,0 +1,301 @@
+import struct
+
+from pack import ExtType
+
+_uint16 = struct.Struct(">H").unpack_from
+_uint32 = struct.Struct(">I").unpack_from
+_uint64 = struct.Struct(">Q").unpack_from
+_int8 = struct.Struct(">b").unpack_from
+_int16 = struct.Struct(">h").unpack_from
+_int32 = struct.Struct(">i").unpack_from
+_int64 = struct.Struct(">q").unpack_from
+_float32 = struct.Struct(">f").unpack_from
+_float64 = struct.Struct(">d").unpack_from
+
+# Width of the length field for str8/16/32 (0xd9-0xdb) and bin8/16/32 (0xc4-0xc6).
+_length_sizes = {0xD9: 1, 0xDA: 2, 0xDB: 4, 0xC4: 1, 0xC5: 2, 0xC6: 4}
+
+# Data size of fixext 1/2/4/8/16 (0xd4-0xd8), and width of the length field
+# of ext 8/16/32 (0xc7-0xc9).
+_fix_ext_sizes = {0xD4: 1, 0xD5: 2, 0xD6: 4, 0xD7: 8, 0xD8: 16}
+_ext_length_sizes = {0xC7: 1, 0xC8: 2, 0xC9: 4}
+
+# Payload size of the fixed-width int and float formats (0xca-0xd3).
+_number_sizes = {
+    0xCA: 4,
+    0xCB: 8,
+    0xCC: 1,
+    0xCD: 2,
+    0xCE: 4,
+    0xCF: 8,
+    0xD0: 1,
+    0xD1: 2,
+    0xD2: 4,
+    0xD3: 8,
+}
+
+_missing = object()
+
+
+class _OutOfData(Exception):
+    pass
+
+
+def unpack(data, zero_copy=False, ext_hook=None):
+    # data can be any buffer-protocol object (bytes, bytearray, memoryview,
+    # mmap, ...). It is read in place, and with zero_copy=True bin and ext
+    # data are returned as memoryview slices of it rather than bytes copies.
+    # Ext values become ExtType(code, data), or ext_hook(code, data) if given.
+    view = memoryview(data).cast("B")
+    try:
+        obj, end = _unpack_from(view, 0, zero_copy, ext_hook)
+        if end != len(view):
+            raise ValueError("Extra data after packed object")
+    finally:
+        # Returned slices keep their own reference to the source buffer.
+        view.release()
+    return obj
+
+
+def _unpack_from(buf, pos, zero_copy=False, ext_hook=None):
+    # Decodes the value starting at buf[pos]; returns it and the end offset.
+    unpacker = Unpacker(ext_hook=ext_hook)
+    unpacker._buffer = buf
+    unpacker._pos = pos
+    unpacker._zero_copy = zero_copy
+    try:
+        obj = unpacker._unpack_next()
+    except _OutOfData:
+        raise ValueError("Unexpected end of data") from None
+    return obj, unpacker._pos
+
+
+def _read_container_header(buf, pos):
+    # Returns (is_map, item count, offset of the first item) for an array or
+    # map header at buf[pos], or None for any other value.
+    head = buf[pos]
+    if 0x80 <= head <= 0x9F:
+        return head <= 0x8F, head & 0x0F, pos + 1
+    if 0xDC <= head <= 0xDF:
+        start = pos + 3 if head & 1 == 0 else pos + 5
+        if start > len(buf):
+            raise ValueError("Unexpected end of data")
+        if head & 1 == 0:
+            n = _uint16(buf, pos + 1)[0]
+        else:
+            n = _uint32(buf, pos + 1)[0]
+        return head >= 0xDE, n, start
+    return None
+
+
+def _skip(buf, pos):
+    # Returns the offset just past the value at buf[pos], reading only the
+    # headers of that value and everything nested in it.
+    end = len(buf)
+    remaining = 1
+    while remaining:
+        if pos >= end:
+            raise ValueError("Unexpected end of data")
+        remaining -= 1
+        head = buf[pos]
+        if head <= 0x7F or head >= 0xE0 or head in (0xC0, 0xC2, 0xC3):
+            pos += 1
+        elif head <= 0x9F or 0xDC <= head <= 0xDF:
+            is_map, n, pos = _read_container_header(buf, pos)
+            remaining += 2 * n if is_map else n
+        elif head <= 0xBF:
+            pos += 1 + (head & 0x1F)
+        elif head in _length_sizes:
+            size = _length_sizes[head]
+            pos += 1 + size + int.from_bytes(buf[pos + 1 : pos + 1 + size], "big")
+        elif head in _number_sizes:
+            pos += 1 + _number_sizes[head]
+        elif head in _fix_ext_sizes:
+            pos += 2 + _fix_ext_sizes[head]
+        elif head in _ext_length_sizes:
+            size = _ext_length_sizes[head]
+            pos += 2 + size + int.from_bytes(buf[pos + 1 : pos + 1 + size], "big")
+        else:
+            raise ValueError("Unknown format byte 0x%02x" % head)
+    if pos > end:
+        raise ValueError("Unexpected end of data")
+    return pos
+
+
+class Unpacker:
+    def __init__(self, ext_hook=None):
+        self._buffer = bytearray()
+        self._pos = 0
+        self._zero_copy = False
+        self._ext_hook = ext_hook
+        # Containers that are still waiting for items, innermost last. Each
+        # entry is [container, remaining items, pending map key].
+        self._stack = []
+
+    def feed(self, data):
+        if self._pos:
+            del self._buffer[: self._pos]
+            self._pos = 0
+        self._buffer += data
+
+    @property
+    def pending(self) -> bool:
+        # True while part of an object is buffered, waiting for more data.
+        return bool(self._stack) or self._pos < len(self._buffer)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self._unpack_next()
+        except _OutOfData:
+            raise StopIteration from None
+
+    def _unpack_next(self):
+        buf = self._buffer
+        end = len(buf)
+        pos = self._pos
+        stack = self._stack
+        while True:
+            # Only whole values and container headers are consumed, so running
+            # out of data leaves self._pos at the start of the missing token and
+            # the next call resumes from there.
+            self._pos = pos
+            if pos >= end:
+                raise _OutOfData
+            head = buf[pos]
+            if head <= 0x7F:
+                obj = head
+                pos += 1
+            elif head >= 0xE0:
+                obj = head - 0x100
+                pos += 1
+            elif head <= 0x8F:
+                pos += 1
+                if head & 0x0F:
+                    stack.append([{}, head & 0x0F, _missing])
+                    continue
+                obj = {}
+            elif head <= 0x9F:
+                pos += 1
+                if head & 0x0F:
+                    stack.append([[], head & 0x0F, _missing])
+                    continue
+                obj = []
+            elif head <= 0xBF:
+                start = pos + 1
+                pos = start + (head & 0x1F)
+                if pos > end:
+                    raise _OutOfData
+                obj = str(buf[start:pos], "utf-8")
+            elif head == 0xC0:
+                obj = None
+                pos += 1
+            elif head == 0xC2:
+                obj = False
+                pos += 1
+            elif head == 0xC3:
+                obj = True
+                pos += 1
+            elif head in _length_sizes:
+                size = _length_sizes[head]
+                start = pos + 1 + size
+                if start > end:
+                    raise _OutOfData
+                pos = start + int.from_bytes(buf[pos + 1 : start], "big")
+                if pos > end:
+                    raise _OutOfData
+                if head >= 0xD9:
+                    obj = str(buf[start:pos], "utf-8")
+                elif self._zero_copy:
+                    obj = buf[start:pos]
+                else:
+                    obj = bytes(buf[start:pos])
+            elif 0xCA <= head <= 0xD3:
+                obj, pos = self._unpack_number(buf, pos, end, head)
+            elif head in _fix_ext_sizes or head in _ext_length_sizes:
+                obj, pos = self._unpack_ext(buf, pos, end, head)
+            elif 0xDC <= head <= 0xDF:
+                size = 2 if head & 1 == 0 else 4
+                if pos + 1 + size > end:
+                    raise _OutOfData
+                n = (_uint16 if size == 2 else _uint32)(buf, pos + 1)[0]
+                pos += 1 + size
+                if n:
+                    container = [] if head <= 0xDD else {}
+                    stack.append([container, n, _missing])
+                    continue
+                obj = [] if head <= 0xDD else {}
+            else:
+                raise ValueError("Unknown format byte 0x%02x" % head)
+
+            # obj is complete; hand it to the innermost open container until
+            # one still needs more items or the top-level value is finished.
+            while stack:
+                frame = stack[-1]
+                container = frame[0]
+                if type(container) is list:
+                    container.append(obj)
+                else:
+                    key = frame[2]
+                    if key is _missing:
+                        frame[2] = tuple(obj) if type(obj) is list else obj
+                        break
+                    container[key] = obj
+                    frame[2] = _missing
+                frame[1] -= 1
+                if frame[1]:
+                    break
+                stack.pop()
+                obj = container
+            else:
+                self._pos = pos
+                return obj
+
+    def _unpack_ext(self, buf, pos, end, head):
+        if head in _fix_ext_sizes:
+            start = pos + 2
+            size = _fix_ext_sizes[head]
+        else:
+            start = pos + 2 + _ext_length_sizes[head]
+            if start > end:
+                raise _OutOfData
+            size = int.from_bytes(buf[pos + 1 : start - 1], "big")
+        if start + size > end:
+            raise _OutOfData
+        code = _int8(buf, start - 1)[0]
+        if self._zero_copy:
+            data = buf[start : start + size]
+        else:
+            data = bytes(buf[start : start + size])
+        if self._ext_hook is not None:
+            return self._ext_hook(code, data), start + size
+        return ExtType(code, data), start + size
+
+    def _unpack_number(self, buf, pos, end, head):
+        if head == 0xCA:
+            reader, size = _float32, 4
+        elif head == 0xCB:
+            reader, size = _float64, 8
+        elif head == 0xCC:
+            reader, size = None, 1
+        elif head == 0xCD:
+            reader, size = _uint16, 2
+        elif head == 0xCE:
+            reader, size = _uint32, 4
+        elif head == 0xCF:
+            reader, size = _uint64, 8
+        elif head == 0xD0:
+            reader, size = _int8, 1
+        elif head == 0xD1:
+            reader, size = _int16, 2
+        elif head == 0xD2:
+            reader, size = _int32, 4
+        else:
+            reader, size = _int64, 8
+        if pos + 1 + size > end:
+            raise _OutOfData
+        if reader is None:
+            return buf[pos + 1], pos + 2
+        return reader(buf, pos + 1)[0], pos + 1 + size